@@ -0,0 +1,102 @@
+import copy
+import hashlib
+import time
+from collections import OrderedDict
+from threading import Lock
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.utils.translation import gettext_lazy as _
+from rest_framework import exceptions
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.metrics import registry
+from foodgram.settings import (TOKEN_CACHE_SHARED, TOKEN_CACHE_SIZE,
+                               TOKEN_CACHE_TTL)
+from users.models import User
+
+
+class TokenCache:
+    '''Кэш пользователей по токену с ограниченным временем жизни.
+
+    При TOKEN_CACHE_SHARED пользователь хранится только в кэше Django,
+    общем для процессов gunicorn: удаление токена в одном процессе сразу
+    видно остальным. Иначе используется LRU в памяти процесса, записи
+    в котором живут не дольше TOKEN_CACHE_TTL секунд.
+    '''
+
+    def __init__(self, size, ttl, shared):
+        self.size = size
+        self.ttl = ttl
+        self.shared = shared
+        self._lock = Lock()
+        self._entries = OrderedDict()
+
+    @staticmethod
+    def shared_key(key):
+        return f'token:{hashlib.sha256(key.encode()).hexdigest()}'
+
+    def get(self, key):
+        if self.shared:
+            return cache.get(self.shared_key(key))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                self._entries.move_to_end(key)
+                return entry[1]
+            self._entries.pop(key, None)
+        return None
+
+    def set(self, key, user):
+        if self.shared:
+            cache.set(self.shared_key(key), user, self.ttl)
+            return
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl, user)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, *keys):
+        if self.shared:
+            cache.delete_many([self.shared_key(key) for key in keys])
+            return
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+
+token_cache = TokenCache(TOKEN_CACHE_SIZE, TOKEN_CACHE_TTL, TOKEN_CACHE_SHARED)
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    '''Аутентификация по токену без запроса к базе на каждый запрос.'''
+
+    def authenticate_credentials(self, key):
+        user = token_cache.get(key)
+        registry.inc('foodgram_cache_requests_total', cache='token',
+                     result='miss' if user is None else 'hit')
+        if user is None:
+            user, token = super().authenticate_credentials(key)
+            token_cache.set(key, user)
+            return copy.copy(user), token
+        if not user.is_active:
+            raise exceptions.AuthenticationFailed(
+                _('User inactive or deleted.'))
+        return copy.copy(user), Token(key=key, user=user)
+
+
+def invalidate_token(instance, **kwargs):
+    token_cache.invalidate(instance.key)
+
+
+def invalidate_user_tokens(instance, **kwargs):
+    keys = Token.objects.filter(user=instance).values_list('key', flat=True)
+    token_cache.invalidate(*keys)
+
+
+post_delete.connect(invalidate_token, sender=Token,
+                    dispatch_uid='invalidate_token')
+post_save.connect(invalidate_user_tokens, sender=User,
+                  dispatch_uid='invalidate_user_tokens')
@@ -0,0 +1,129 @@
+import gzip
+import hashlib
+import time
+from urllib.parse import urlencode
+
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.http import HttpResponse
+from django.utils.cache import patch_vary_headers
+
+from foodgram.settings import RESPONSE_CACHE_COMPRESS, RESPONSE_CACHE_TIMEOUT
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+
+class ResponseCache:
+    '''Кэш готовых JSON-ответов с инвалидацией по тегам-поколениям.
+
+    Вместе с телом ответа хранятся поколения его тегов. Изменение данных
+    увеличивает поколение тега, и все ответы с этим тегом перестают
+    считаться актуальными.
+    '''
+
+    def __init__(self, prefix):
+        self.prefix = prefix
+
+    def key(self, request):
+        params = sorted(
+            (name, value)
+            for name, values in request.query_params.lists()
+            for value in values
+        )
+        digest = hashlib.md5(
+            f'{request.path}?{urlencode(params)}'.encode()).hexdigest()
+        return f'{self.prefix}:page:{digest}'
+
+    def generations(self, tags):
+        keys = {f'{self.prefix}:tag:{tag}': tag for tag in tags}
+        found = cache.get_many(keys)
+        missing = {key: time.time_ns() for key in keys if key not in found}
+        if missing:
+            cache.set_many(missing, None)
+            found.update(missing)
+        return {keys[key]: generation for key, generation in found.items()}
+
+    def bump(self, *tags):
+        for tag in tags:
+            key = f'{self.prefix}:tag:{tag}'
+            try:
+                cache.incr(key)
+            except ValueError:
+                cache.set(key, time.time_ns(), None)
+
+    def bump_on_commit(self, *tags):
+        transaction.on_commit(lambda: self.bump(*tags))
+
+    def count(self, name):
+        key = f'{self.prefix}:stats:{name}'
+        cache.add(key, 0, None)
+        try:
+            cache.incr(key)
+        except ValueError:
+            pass
+
+    def stats(self):
+        keys = {f'{self.prefix}:stats:{name}': name
+                for name in ('hits', 'misses')}
+        values = cache.get_many(keys)
+        return {name: values.get(key, 0) for key, name in keys.items()}
+
+    def get(self, request):
+        entry = cache.get(self.key(request))
+        if entry is None or self.generations(entry['tags']) != entry['tags']:
+            self.count('misses')
+            return None
+        self.count('hits')
+        return entry
+
+    def set(self, request, body, tags, snapshot):
+        '''Сохраняет ответ с поколениями тегов.
+
+        snapshot - поколения, прочитанные до запроса к базе. Они важнее
+        текущих: если данные изменились, пока ответ собирался, запись сразу
+        окажется устаревшей. Теги, которые стали известны только из ответа
+        (авторы), берутся по текущему поколению.
+        '''
+        entry = {
+            'tags': {**self.generations(tags), **snapshot},
+            'body': gzip.compress(body) if RESPONSE_CACHE_COMPRESS else body,
+            'compressed': RESPONSE_CACHE_COMPRESS,
+        }
+        cache.set(self.key(request), entry, RESPONSE_CACHE_TIMEOUT)
+        return entry
+
+    def response(self, request, entry, status):
+        body = entry['body']
+        accepts_gzip = 'gzip' in request.META.get('HTTP_ACCEPT_ENCODING', '')
+        response = HttpResponse(content_type='application/json')
+        if entry['compressed'] and accepts_gzip:
+            response['Content-Encoding'] = 'gzip'
+        elif entry['compressed']:
+            body = gzip.decompress(body)
+        response.content = body
+        response['X-Cache'] = status
+        patch_vary_headers(response, ('Accept-Encoding', 'Authorization'))
+        return response
+
+
+recipe_list_cache = ResponseCache('recipe_list')
+
+
+def bump_recipes(**kwargs):
+    recipe_list_cache.bump_on_commit('recipes')
+
+
+def bump_user(instance, **kwargs):
+    recipe_list_cache.bump_on_commit(f'user:{instance.pk}')
+
+
+for model in (Recipe, IngredientInRecipe, Tag, Ingredient):
+    post_save.connect(bump_recipes, sender=model,
+                      dispatch_uid=f'recipe_list_{model._meta.label_lower}')
+    post_delete.connect(bump_recipes, sender=model,
+                        dispatch_uid=f'recipe_list_{model._meta.label_lower}')
+m2m_changed.connect(bump_recipes, sender=Recipe.tags.through,
+                    dispatch_uid='recipe_list_recipe_tags')
+post_save.connect(bump_user, sender=User, dispatch_uid='recipe_list_user')
+post_delete.connect(bump_user, sender=User, dispatch_uid='recipe_list_user')
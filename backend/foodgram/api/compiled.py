@@ -0,0 +1,159 @@
+from operator import attrgetter
+
+from django.db import models
+from rest_framework import serializers
+from rest_framework.relations import PKOnlyObject
+
+from api.timing import TimedListSerializer
+
+PLAIN_FIELDS = {
+    serializers.IntegerField: int,
+    serializers.CharField: str,
+    serializers.EmailField: str,
+    serializers.SlugField: str,
+    serializers.BooleanField: bool,
+    serializers.ReadOnlyField: None,
+}
+
+
+def plain_converter(field):
+    '''Для простого поля - (путь к атрибуту, преобразование), иначе None.
+
+    Простым считается поле из PLAIN_FIELDS, источник которого - атрибут
+    или цепочка атрибутов, а не метод.
+    '''
+    if type(field) not in PLAIN_FIELDS or field.source == '*':
+        return None
+    return '.'.join(field.source_attrs), PLAIN_FIELDS[type(field)]
+
+
+def source_getter(field):
+    if field.source == '*':
+        return lambda instance: instance
+    return attrgetter('.'.join(field.source_attrs))
+
+
+def related_getter(field):
+    '''Чтение связанных объектов, по возможности из кэша prefetch.
+
+    Кэш prefetch_related читается напрямую, без создания менеджера
+    связи для каждого объекта.
+    '''
+    get = source_getter(field)
+    if len(field.source_attrs) != 1:
+        return lambda instance: iterate(get(instance))
+    name = field.source_attrs[0]
+
+    def related(instance):
+        prefetched = getattr(instance, '_prefetched_objects_cache', {})
+        if name in prefetched:
+            return prefetched[name]
+        return iterate(get(instance))
+
+    return related
+
+
+def skip_none(get, represent):
+    def compiled(instance):
+        value = get(instance)
+        if value is None:
+            return None
+        return represent(value)
+
+    return compiled
+
+
+def generic_getter(field):
+    '''Чтение поля через get_attribute и to_representation самого поля.'''
+    def compiled(instance):
+        attribute = field.get_attribute(instance)
+        if isinstance(attribute, PKOnlyObject):
+            check_for_none = attribute.pk
+        else:
+            check_for_none = attribute
+        if check_for_none is None:
+            return None
+        return field.to_representation(attribute)
+
+    return compiled
+
+
+def compile_field(serializer, field):
+    '''Функция obj -> представление поля, повторяющая Serializer.'''
+    plain = plain_converter(field)
+    if plain is not None:
+        path, convert = plain
+        if convert is None:
+            return attrgetter(path)
+        return skip_none(attrgetter(path), convert)
+    if isinstance(field, serializers.SerializerMethodField):
+        return getattr(serializer, field.method_name)
+    if isinstance(field, serializers.ListSerializer):
+        represent = compile_serializer(field.child)
+        get = related_getter(field)
+        return lambda instance: [represent(item) for item in get(instance)]
+    if isinstance(field, serializers.BaseSerializer):
+        return skip_none(source_getter(field), compile_serializer(field))
+    return generic_getter(field)
+
+
+def compile_fields(serializer, **overrides):
+    '''Функция obj -> dict по полям сериализатора, без OrderedDict.
+
+    overrides - готовые функции для отдельных полей.
+    '''
+    getters = tuple(
+        (field.field_name, overrides.get(field.field_name)
+         or compile_field(serializer, field))
+        for field in serializer._readable_fields
+    )
+    return lambda instance: {name: get(instance) for name, get in getters}
+
+
+def compile_serializer(serializer):
+    '''Функция представления объекта для сериализатора.
+
+    Сериализатор может задать свой способ через метод compile.
+    '''
+    if hasattr(serializer, 'compile'):
+        return serializer.compile()
+    return compile_fields(serializer)
+
+
+def iterate(data):
+    return data.all() if isinstance(data, models.Manager) else data
+
+
+class CompiledListSerializer(TimedListSerializer):
+    '''Список только для чтения с заранее собранными функциями полей.
+
+    Поля дочернего сериализатора разбираются один раз на весь список,
+    строки собираются в обычные dict с тем же порядком ключей, поэтому
+    JSON совпадает с ответом ListSerializer байт в байт. Невычисленный
+    QuerySet сериализатора из одних простых полей читается через
+    values_list без создания объектов модели.
+    '''
+
+    def to_representation(self, data):
+        plain = [(field.field_name, plain_converter(field))
+                 for field in self.child._readable_fields]
+        if (isinstance(data, models.QuerySet) and data._result_cache is None
+                and not data._prefetch_related_lookups
+                and all(converter is not None for _, converter in plain)):
+            return self.values_representation(data, plain)
+        represent = compile_serializer(self.child)
+        return [represent(item) for item in iterate(data)]
+
+    @staticmethod
+    def values_representation(queryset, plain):
+        names = [name for name, _ in plain]
+        paths = [path.replace('.', '__') for _, (path, _) in plain]
+        converters = [convert for _, (_, convert) in plain]
+        return [
+            {
+                name: value if convert is None or value is None
+                else convert(value)
+                for name, value, convert in zip(names, row, converters)
+            }
+            for row in queryset.values_list(*paths)
+        ]
@@ -0,0 +1,133 @@
+from django.core.exceptions import ValidationError as DjangoValidationError
+from drf_extra_fields.fields import Base64FileField
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+IMAGE_SIGNATURES = (
+    (b'\xff\xd8\xff', 'jpeg'),
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+)
+
+
+class Base64ImageUploadField(Base64FileField):
+    '''Изображение в base64 без разбора Pillow в запросе.
+
+    Тип определяется по сигнатуре файла. Проверка и подготовка копий
+    изображения выполняются командой process_images.
+    '''
+    ALLOWED_TYPES = ('jpeg', 'png', 'gif', 'webp')
+
+    def get_file_extension(self, filename, decoded_file):
+        if decoded_file[:4] == b'RIFF' and decoded_file[8:12] == b'WEBP':
+            return 'webp'
+        for signature, extension in IMAGE_SIGNATURES:
+            if decoded_file.startswith(signature):
+                return extension
+        return None
+
+
+class RecipeImageField(serializers.Field):
+    '''Ссылка на изображение рецепта.
+
+    Если задан variant и копия уже готова, отдаётся ссылка на неё.
+    Вариант можно передать и через контекст сериализатора (image_variant).
+    '''
+
+    def __init__(self, variant=None, **kwargs):
+        self.variant = variant
+        kwargs['source'] = '*'
+        kwargs['read_only'] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, recipe):
+        image = recipe.image
+        variant = self.variant or self.context.get('image_variant')
+        if variant and getattr(recipe, variant):
+            image = getattr(recipe, variant)
+        if not image:
+            return None
+        request = self.context.get('request')
+        if request is None:
+            return image.url
+        return request.build_absolute_uri(image.url)
+
+
+class BatchedPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    '''Первичный ключ, объекты по которому загружаются пачкой.
+
+    Само поле проверяет только формат ключа. Объекты подставляют
+    BatchedManyRelatedField (many=True) и BatchedListSerializer
+    (поле вложенного сериализатора): одним запросом IN на все ключи.
+    '''
+    default_error_messages = {
+        'does_not_exist_many': (
+            'Недопустимые первичные ключи {pk_values} - объекты не '
+            'существуют.'),
+    }
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {'child_relation': cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BatchedManyRelatedField(**list_kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        try:
+            if isinstance(data, bool):
+                raise TypeError
+            return self.get_queryset().model._meta.pk.to_python(data)
+        except (TypeError, ValueError, DjangoValidationError):
+            self.fail('incorrect_type', data_type=type(data).__name__)
+
+    def resolve(self, pks):
+        '''Объекты {pk: объект} по всем pks одним запросом.
+
+        Если каких-то объектов нет, все отсутствующие ключи попадают
+        в одну ошибку.
+        '''
+        objects = self.get_queryset().in_bulk(set(pks))
+        missing = sorted({pk for pk in pks if pk not in objects})
+        if missing:
+            self.fail('does_not_exist_many',
+                      pk_values=', '.join(map(str, missing)))
+        return objects
+
+
+class BatchedManyRelatedField(serializers.ManyRelatedField):
+    '''Список ключей BatchedPrimaryKeyRelatedField.'''
+
+    def to_internal_value(self, data):
+        pks = super().to_internal_value(data)
+        objects = self.child_relation.resolve(pks)
+        return [objects[pk] for pk in pks]
+
+
+class BatchedListSerializer(serializers.ListSerializer):
+    '''Список вложенных объектов со ссылками, загружаемыми пачкой.
+
+    Поля BatchedPrimaryKeyRelatedField дочернего сериализатора
+    разрешаются одним запросом на поле для всего списка.
+    '''
+
+    def to_internal_value(self, data):
+        items = super().to_internal_value(data)
+        for name, field in self.child.fields.items():
+            if (field.read_only
+                    or not isinstance(field, BatchedPrimaryKeyRelatedField)):
+                continue
+            source = field.source
+            try:
+                objects = field.resolve(
+                    [item[source] for item in items if source in item])
+            except serializers.ValidationError as exc:
+                raise serializers.ValidationError({name: exc.detail})
+            for item in items:
+                if source in item:
+                    item[source] = objects[item[source]]
+        return items
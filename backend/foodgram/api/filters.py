@@ -18,6 +18,7 @@ class RecipeFilter(FilterSet):
     is_in_shopping_cart = filters.BooleanFilter(
         method='is_in_shopping_cart_filter'
     )
+    search = filters.CharFilter(method='search_filter')
 
     class Meta:
         model = Recipe
@@ -34,3 +35,6 @@ class RecipeFilter(FilterSet):
         if value and user.is_authenticated:
             return queryset.filter(in_shopping_cart__user=user)
         return queryset
+
+    def search_filter(self, queryset, name, value):
+        return queryset.search(value)
@@ -0,0 +1,81 @@
+from bisect import bisect_left
+from threading import Lock
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from api.serializers import IngredientSerializer
+from foodgram.settings import INGREDIENT_SEARCH_LIMIT
+from recipes.models import Ingredient, TableVersion
+
+TABLE = Ingredient._meta.label_lower
+
+
+class IngredientIndex:
+    '''Индекс названий ингредиентов в памяти процесса.
+
+    Строится при первом поиске и сбрасывается сигналами при изменении
+    ингредиентов. Изменения из других процессов подхватываются по версии
+    таблицы ингредиентов: индекс перестраивается, если она отличается от
+    версии, при которой он был построен.
+    '''
+
+    def __init__(self):
+        self._lock = Lock()
+        self._keys = []
+        self._items = []
+        self._version = None
+
+    def invalidate(self):
+        self._version = None
+
+    @staticmethod
+    def current_version():
+        version, _ = TableVersion.objects.current(TABLE).get(TABLE, (0, None))
+        return version
+
+    def _build(self, version):
+        with self._lock:
+            if self._version == version:
+                return
+            items = sorted(
+                IngredientSerializer(Ingredient.objects.all(), many=True).data,
+                key=lambda item: (item['name'].lower(), item['id']),
+            )
+            self._keys = [item['name'].lower() for item in items]
+            self._items = items
+            self._version = version
+
+    def search(self, name, version=None, limit=INGREDIENT_SEARCH_LIMIT):
+        '''Ингредиенты, название которых начинается с name или содержит его.
+
+        Совпадения по началу названия идут первыми. version - текущая
+        версия таблицы ингредиентов; если не передана, читается из базы.
+        '''
+        if version is None:
+            version = self.current_version()
+        if self._version != version:
+            self._build(version)
+        keys, items = self._keys, self._items
+        name = name.lower()
+        result = []
+        position = bisect_left(keys, name)
+        while (position < len(keys) and len(result) < limit
+               and keys[position].startswith(name)):
+            result.append(items[position])
+            position += 1
+        if len(result) < limit:
+            for key, item in zip(keys, items):
+                if name in key and not key.startswith(name):
+                    result.append(item)
+                    if len(result) == limit:
+                        break
+        return result
+
+
+ingredient_index = IngredientIndex()
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def invalidate_ingredient_index(**kwargs):
+    ingredient_index.invalidate()
@@ -0,0 +1,281 @@
+import base64
+import io
+import json
+import math
+import tempfile
+import time
+from itertools import combinations
+
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, Recipe, Tag
+from users.models import User
+
+QUERY_BUDGETS = {
+    'recipes-list-anonymous': 4,
+    'recipes-list': 4,
+    # Самые дорогие сочетания фильтров: tags и author.
+    'recipes-list-filtered': 6,
+    'recipes-detail': 5,
+    'recipes-batch': 3,
+    'subscriptions': 3,
+    'ingredients-search': 1,
+    'favorite-add': 5,
+    'favorite-remove': 4,
+    'shopping-cart-add': 7,
+    'shopping-cart-remove': 7,
+    'favorite-bulk-add': 4,
+    'favorite-bulk-remove': 4,
+    'shopping-cart-bulk-add': 6,
+    'shopping-cart-bulk-remove': 7,
+    'subscribe': 4,
+    'unsubscribe': 2,
+    'download-shopping-cart': 1,
+    'recipe-create': 20,
+    'recipe-update-text': 14,
+    # С учётом пересчёта списков покупок, если рецепт лежит в корзинах.
+    'recipe-update-ingredients': 21,
+}
+
+LIST_FILTERS = (
+    ('tags', lambda data: f"tags={data['tags'][0]}&tags={data['tags'][1]}"),
+    ('author', lambda data: f"author={data['author']}"),
+    ('is_favorited', lambda data: 'is_favorited=1'),
+    ('is_in_shopping_cart', lambda data: 'is_in_shopping_cart=1'),
+    ('search', lambda data: 'search=борщ'),
+)
+
+
+def percentile(values, share):
+    ordered = sorted(values)
+    return ordered[max(math.ceil(share * len(ordered)) - 1, 0)]
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (64, 48), 'orange').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+class Command(BaseCommand):
+    help = ("Замер задержек и числа SQL-запросов по эндпоинтам API на "
+            "синтетических данных с проверкой бюджетов запросов")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--recipes', type=int, default=2000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--output',
+                            help='Файл JSON-отчёта, без него отчёт '
+                                 'выводится в stdout')
+
+    def handle(self, *args, **options):
+        self.repeat = options['repeat']
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+                MEDIA_ROOT=media_root, ALLOWED_HOSTS=['testserver']):
+            with transaction.atomic():
+                data = self.seed(options)
+                results = self.run(data)
+                transaction.set_rollback(True)
+        report = {
+            'meta': {
+                'created_at': timezone.now().isoformat(),
+                'database': connection.vendor,
+                'users': options['users'],
+                'recipes': options['recipes'],
+                'repeat': options['repeat'],
+                'seed': options['seed'],
+            },
+            'endpoints': results,
+        }
+        if options['output'] is None:
+            self.stdout.write(json.dumps(report, ensure_ascii=False,
+                                         indent=2, sort_keys=True))
+        else:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(report, file, ensure_ascii=False, indent=2,
+                          sort_keys=True)
+            for name, result in sorted(results.items()):
+                self.stdout.write(
+                    f"{name}: p50 {result['p50_ms']} мс, "
+                    f"p95 {result['p95_ms']} мс, "
+                    f"запросов {result['queries']} из {result['budget']}")
+        failed = [name for name, result in results.items()
+                  if not result['ok']]
+        if failed:
+            raise CommandError(
+                f"Превышен бюджет или неверный статус: {', '.join(failed)}")
+
+    def seed(self, options):
+        if not Ingredient.objects.exists():
+            Ingredient.objects.bulk_create(
+                Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+                for number in range(500))
+        call_command('seed_data', users=options['users'],
+                     recipes=options['recipes'], seed=options['seed'],
+                     prefix='benchmark', stdout=io.StringIO())
+        users = User.objects.filter(username__startswith='benchmark')
+        user = users.order_by('-recipes_count').first()
+        client = APIClient()
+        client.credentials(
+            HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}')
+        recipe, text_recipe = Recipe.objects.filter(author=user)[:2]
+        ingredients = list(
+            Ingredient.objects.values_list('pk', flat=True)[:30])
+        return {
+            'user': user,
+            'client': client,
+            'anonymous': APIClient(),
+            'recipe': recipe,
+            'text_recipe': text_recipe,
+            'text_recipe_body': {
+                'name': text_recipe.name,
+                'cooking_time': text_recipe.cooking_time,
+                'tags': list(text_recipe.tags.values_list('pk', flat=True)),
+                'ingredients': [
+                    {'id': pk, 'amount': amount} for pk, amount in
+                    text_recipe.recipe_ingredients.values_list(
+                        'ingredient_id', 'amount')
+                ],
+            },
+            'other_recipe': Recipe.objects.exclude(
+                in_favorite__user=user).exclude(
+                    in_shopping_cart__user=user).first(),
+            'bulk_recipes': list(Recipe.objects.exclude(
+                in_favorite__user=user).exclude(
+                    in_shopping_cart__user=user).values_list(
+                        'pk', flat=True)[1:11]),
+            'other_author': users.exclude(pk=user.pk).exclude(
+                following__user=user).first(),
+            'batch': ','.join(map(str, Recipe.objects.values_list(
+                'pk', flat=True)[:40])),
+            'tags': list(Tag.objects.values_list('slug', flat=True)[:2]),
+            'tag_ids': list(Tag.objects.values_list('pk', flat=True)[:2]),
+            'author': user.pk,
+            'ingredients': ingredients,
+            'image': image_data(),
+        }
+
+    def cases(self, data):
+        client, anonymous = data['client'], data['anonymous']
+        recipe, other = data['recipe'].pk, data['other_recipe'].pk
+        author = data['other_author'].pk
+
+        def recipe_body(offset):
+            return {
+                'name': 'Рецепт для замеров',
+                'text': f'Описание {offset}',
+                'cooking_time': 10,
+                'tags': data['tag_ids'],
+                'ingredients': [
+                    {'id': pk, 'amount': 10 + offset}
+                    for pk in data['ingredients'][offset:offset + 10]
+                ],
+            }
+
+        yield ('recipes-list-anonymous', 200,
+               lambda step: anonymous.get('/api/recipes/'))
+        for size in range(len(LIST_FILTERS) + 1):
+            for combination in combinations(LIST_FILTERS, size):
+                query = '&'.join(build(data) for _, build in combination)
+                name = '+'.join(key for key, _ in combination)
+                yield (f'recipes-list{"?" + name if name else ""}', 200,
+                       lambda step, query=query: client.get(
+                           f'/api/recipes/?{query}'))
+        yield ('recipes-detail', 200,
+               lambda step: client.get(f'/api/recipes/{recipe}/'))
+        yield ('recipes-batch', 200, lambda step: client.get(
+            f"/api/recipes/?ids={data['batch']}"))
+        yield ('subscriptions', 200, lambda step: client.get(
+            '/api/users/subscriptions/?recipes_limit=3'))
+        yield ('ingredients-search', 200,
+               lambda step: client.get('/api/ingredients/?name=Ингр'))
+        for name, path in (('favorite', 'favorite'),
+                           ('shopping-cart', 'shopping_cart')):
+            url = f'/api/recipes/{other}/{path}/'
+            yield (f'{name}-add', 201,
+                   lambda step, url=url: client.post(url))
+            yield (f'{name}-remove', 204,
+                   lambda step, url=url: client.delete(url))
+            url = f'/api/recipes/{path}/'
+            body = {'ids': data['bulk_recipes']}
+            yield (f'{name}-bulk-add', 200, lambda step, url=url: client.post(
+                url, body, format='json'))
+            yield (f'{name}-bulk-remove', 200,
+                   lambda step, url=url: client.delete(
+                       url, body, format='json'))
+        url = f'/api/users/{author}/subscribe/'
+        yield 'subscribe', 201, lambda step: client.post(url)
+        yield 'unsubscribe', 204, lambda step: client.delete(url)
+        yield ('download-shopping-cart', 200, lambda step: client.get(
+            '/api/recipes/download_shopping_cart/'))
+        yield ('recipe-create', 201, lambda step: client.post(
+            '/api/recipes/', {**recipe_body(step % 3), 'image': data['image']},
+            format='json'))
+        text_recipe = data['text_recipe'].pk
+        text_body = data['text_recipe_body']
+        yield ('recipe-update-text', 200, lambda step: client.patch(
+            f'/api/recipes/{text_recipe}/',
+            {**text_body, 'text': f'Описание {step}'}, format='json'))
+        yield ('recipe-update-ingredients', 200, lambda step: client.patch(
+            f'/api/recipes/{recipe}/', recipe_body(step % 3), format='json'))
+
+    def measure(self, request, step):
+        '''Статус, число запросов и длительность одного запроса.
+
+        Замеры идут внутри транзакции, которая откатывается, поэтому
+        колбэки on_commit (инвалидация кэшей) выполняются сразу после
+        запроса и учитываются в его запросах и времени.
+        '''
+        with CaptureQueriesContext(connection) as queries:
+            start = time.perf_counter()
+            with TestCase.captureOnCommitCallbacks(execute=True):
+                response = request(step)
+                if response.streaming:
+                    b''.join(response.streaming_content)
+            duration = time.perf_counter() - start
+        return response.status_code, len(queries), duration
+
+    def run(self, data):
+        '''Прогоняет сценарии по очереди: разогрев и repeat замеров.
+
+        Сценарии идут парами (добавление и удаление), поэтому каждый
+        шаг выполняет все сценарии подряд.
+        '''
+        cases = list(self.cases(data))
+        for name, _, request in cases:
+            self.measure(request, 0)
+        samples = {name: [] for name, _, _ in cases}
+        for step in range(1, self.repeat + 1):
+            for name, _, request in cases:
+                samples[name].append(self.measure(request, step))
+        results = {}
+        for name, expected, _ in cases:
+            statuses = {status for status, _, _ in samples[name]}
+            queries = max(count for _, count, _ in samples[name])
+            durations = [duration * 1000 for _, _, duration in samples[name]]
+            endpoint, _, filters = name.partition('?')
+            budget = QUERY_BUDGETS.get(
+                f'{endpoint}-filtered' if filters else endpoint)
+            results[name] = {
+                'statuses': sorted(statuses),
+                'queries': queries,
+                'budget': budget,
+                'p50_ms': round(percentile(durations, 0.5), 2),
+                'p95_ms': round(percentile(durations, 0.95), 2),
+                'p99_ms': round(percentile(durations, 0.99), 2),
+                'mean_ms': round(sum(durations) / len(durations), 2),
+                'ok': statuses == {expected} and (
+                    budget is None or queries <= budget),
+            }
+        return results
@@ -0,0 +1,40 @@
+import time
+from functools import partial
+
+from django.core.management.base import BaseCommand
+
+from api.indexes import ingredient_index
+from api.serializers import IngredientSerializer
+from recipes.models import Ingredient
+
+
+def measure(search, names, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for name in names:
+            search(name)
+    return (time.perf_counter() - start) / (repeat * len(names)) * 10 ** 6
+
+
+def orm_search(name):
+    return IngredientSerializer(
+        Ingredient.objects.filter(name__istartswith=name), many=True).data
+
+
+class Command(BaseCommand):
+    help = "Сравнение поиска ингредиентов через индекс и через ORM"
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*',
+                            default=['а', 'мо', 'сах', 'кур', 'мук'])
+        parser.add_argument('--repeat', type=int, default=100)
+
+    def handle(self, *args, **options):
+        names, repeat = options['names'], options['repeat']
+        version = ingredient_index.current_version()
+        ingredient_index.search('', version)
+        orm = measure(orm_search, names, repeat)
+        index = measure(partial(ingredient_index.search, version=version),
+                        names, repeat)
+        self.stdout.write(f"ORM:    {orm:.1f} мкс на запрос")
+        self.stdout.write(f"Индекс: {index:.1f} мкс на запрос")
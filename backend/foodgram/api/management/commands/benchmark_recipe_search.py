@@ -0,0 +1,71 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Q
+
+from recipes.models import Recipe
+from recipes.search import rebuild_index
+from users.models import User
+
+WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'курица', 'говядина', 'рыба',
+    'картофель', 'свёкла', 'капуста', 'морковь', 'лук', 'чеснок', 'сыр',
+    'грибы', 'рис', 'гречка', 'паста', 'соус', 'тесто', 'сметана',
+    'запечённый', 'жареный', 'тушёный', 'домашний', 'острый', 'сладкий',
+    'быстрый', 'праздничный', 'летний', 'зимний', 'классический',
+)
+
+
+def measure(search, queries, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for query in queries:
+            search(query)
+    return (time.perf_counter() - start) / (repeat * len(queries)) * 1000
+
+
+def indexed_search(query):
+    return list(Recipe.objects.search(query).values_list('id', flat=True)[:6])
+
+
+def icontains_search(query):
+    return list(Recipe.objects.filter(
+        Q(name__icontains=query) | Q(text__icontains=query)
+    ).values_list('id', flat=True)[:6])
+
+
+class Command(BaseCommand):
+    help = ("Сравнение полнотекстового поиска рецептов с icontains "
+            "на временно созданных рецептах")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100000)
+        parser.add_argument('--repeat', type=int, default=20)
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('queries', nargs='*',
+                            default=['борщ', 'курица', 'домашний пирог'])
+
+    def handle(self, *args, **options):
+        generator = random.Random(options['seed'])
+        with transaction.atomic():
+            author = User.objects.create(
+                email='benchmark@foodgram.local', username='benchmark')
+            Recipe.objects.bulk_create(
+                (Recipe(
+                    author=author,
+                    name=' '.join(generator.choices(WORDS, k=3)),
+                    text=' '.join(generator.choices(WORDS, k=12)),
+                    cooking_time=generator.randint(1, 180),
+                ) for _ in range(options['recipes'])),
+                batch_size=1000,
+            )
+            rebuild_index()
+            queries, repeat = options['queries'], options['repeat']
+            indexed = measure(indexed_search, queries, repeat)
+            icontains = measure(icontains_search, queries, repeat)
+            transaction.set_rollback(True)
+        self.stdout.write(f"Рецептов: {options['recipes']}")
+        self.stdout.write(f"Индекс:    {indexed:.2f} мс на запрос")
+        self.stdout.write(f"icontains: {icontains:.2f} мс на запрос")
@@ -0,0 +1,60 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer, orjson
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer)
+from recipes.models import Ingredient, Recipe, Tag
+
+
+def measure(renderer, data, repeat):
+    start = time.perf_counter()
+    for _ in range(repeat):
+        renderer.render(data)
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = ("Сравнение времени рендеринга ответов стандартным "
+            "JSONRenderer и FastJSONRenderer")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=100,
+                            help='Количество рецептов на странице')
+        parser.add_argument('--repeat', type=int, default=50)
+
+    def endpoints(self, recipes):
+        request = APIRequestFactory().get('/api/recipes/')
+        context = {'request': request}
+        return {
+            '/api/ingredients/': IngredientSerializer(
+                Ingredient.objects.all(), many=True).data,
+            '/api/tags/': TagSerializer(Tag.objects.all(), many=True).data,
+            f'/api/recipes/?limit={recipes}': {
+                'results': RecipeReadSerializer(
+                    Recipe.objects.for_read()[:recipes],
+                    many=True, context=context).data,
+            },
+        }
+
+    # Запросы APIRequestFactory приходят на хост testserver.
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        if orjson is None:
+            self.stdout.write(
+                'orjson не установлен, FastJSONRenderer использует json')
+        standard, fast = JSONRenderer(), FastJSONRenderer()
+        repeat = options['repeat']
+        for path, data in self.endpoints(options['recipes']).items():
+            if standard.render(data) != fast.render(data):
+                raise CommandError(f'{path}: ответы рендереров различаются')
+            size = len(fast.render(data))
+            before = measure(standard, data, repeat)
+            after = measure(fast, data, repeat)
+            self.stdout.write(
+                f'{path} ({size} байт): json {before:.2f} мс, '
+                f'orjson {after:.2f} мс, x{before / after:.1f}')
@@ -0,0 +1,61 @@
+import timeit
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test.utils import override_settings
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIRequestFactory
+
+from api.renderers import FastJSONRenderer
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer)
+from recipes.models import Ingredient, Recipe, Tag
+
+
+def measure(serialize, repeat):
+    return timeit.timeit(serialize, number=repeat) / repeat * 1000
+
+
+class Command(BaseCommand):
+    help = ("Проверка совпадения ответов скомпилированных сериализаторов "
+            "с ListSerializer и сравнение их скорости")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--recipes', type=int, default=300,
+                            help='Количество рецептов в списке')
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def cases(self, recipes):
+        context = {'request': APIRequestFactory().get('/api/recipes/'),
+                   'image_variant': 'image_thumbnail'}
+        recipe_list = list(Recipe.objects.for_read()[:recipes])
+        return (
+            ('ingredients', IngredientSerializer, Ingredient.objects.all,
+             {}),
+            ('tags', TagSerializer, Tag.objects.all, {}),
+            (f'recipes[{len(recipe_list)}]', RecipeReadSerializer,
+             lambda: recipe_list, context),
+        )
+
+    # Запросы APIRequestFactory приходят на хост testserver.
+    @override_settings(ALLOWED_HOSTS=['testserver'])
+    def handle(self, *args, **options):
+        renderer = FastJSONRenderer()
+        repeat = options['repeat']
+        for name, serializer_class, data, context in self.cases(
+                options['recipes']):
+            def standard():
+                return ListSerializer(
+                    data(), child=serializer_class(), context=context).data
+
+            def compiled():
+                return serializer_class(
+                    data(), many=True, context=context).data
+
+            if renderer.render(standard()) != renderer.render(compiled()):
+                raise CommandError(
+                    f'{name}: ответы сериализаторов различаются')
+            before = measure(standard, repeat)
+            after = measure(compiled, repeat)
+            self.stdout.write(
+                f'{name}: ListSerializer {before:.2f} мс, '
+                f'скомпилированный {after:.2f} мс, x{before / after:.1f}')
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from api.cache import recipe_list_cache
+
+
+class Command(BaseCommand):
+    help = "Статистика кэша списка рецептов для анонимных пользователей"
+
+    def handle(self, *args, **options):
+        stats = recipe_list_cache.stats()
+        total = stats['hits'] + stats['misses']
+        ratio = stats['hits'] / total if total else 0
+        self.stdout.write(
+            f"Попаданий: {stats['hits']}, промахов: {stats['misses']}, "
+            f"доля попаданий: {ratio:.1%}"
+        )
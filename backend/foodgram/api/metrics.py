@@ -0,0 +1,181 @@
+import json
+import os
+import time
+from collections import defaultdict
+from threading import Lock, get_ident
+
+from foodgram.settings import (METRICS_DIR, METRICS_FLUSH_INTERVAL,
+                               METRICS_LATENCY_BUCKETS)
+
+METRICS = {
+    'foodgram_http_requests_total': (
+        'counter', 'Число HTTP-запросов по представлению и статусу.'),
+    'foodgram_http_request_duration_seconds': (
+        'histogram', 'Время обработки запроса по представлению.'),
+    'foodgram_db_queries_total': (
+        'counter', 'Число SQL-запросов по представлению.'),
+    'foodgram_db_query_duration_seconds_total': (
+        'counter', 'Суммарное время SQL-запросов по представлению.'),
+    'foodgram_cache_requests_total': (
+        'counter', 'Обращения к кэшам: попадания и промахи.'),
+    'foodgram_cache_hit_ratio': (
+        'gauge', 'Доля попаданий в кэш.'),
+}
+
+
+class MetricsRegistry:
+    '''Счётчики процесса, суммируемые по всем воркерам gunicorn.
+
+    Каждый процесс хранит значения в памяти и не чаще раза в
+    METRICS_FLUSH_INTERVAL секунд сбрасывает их в свой файл в METRICS_DIR.
+    При выдаче метрик файлы всех процессов складываются, поэтому
+    счётчики завершившихся воркеров не теряются.
+    '''
+
+    def __init__(self, directory, flush_interval):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._lock = Lock()
+        self._values = defaultdict(float)
+        self._flushed_at = 0.0
+
+    @staticmethod
+    def key(name, labels):
+        return name, tuple(sorted(labels.items()))
+
+    def inc(self, name, value=1, **labels):
+        with self._lock:
+            self._values[self.key(name, labels)] += value
+        self.maybe_flush()
+
+    def observe(self, name, value, **labels):
+        '''Добавляет значение в гистограмму name.'''
+        with self._lock:
+            for bound in (*METRICS_LATENCY_BUCKETS, float('inf')):
+                if value <= bound:
+                    self._values[self.key(
+                        f'{name}_bucket', {**labels, 'le': bound})] += 1
+            self._values[self.key(f'{name}_sum', labels)] += value
+            self._values[self.key(f'{name}_count', labels)] += 1
+        self.maybe_flush()
+
+    def record_request(self, view, method, status, metrics):
+        '''Учитывает запрос по замерам RequestMetrics.'''
+        self.inc('foodgram_http_requests_total',
+                 view=view, method=method, status=str(status))
+        self.observe('foodgram_http_request_duration_seconds',
+                     metrics.total, view=view)
+        self.inc('foodgram_db_queries_total', metrics.query_count,
+                 view=view)
+        self.inc('foodgram_db_query_duration_seconds_total',
+                 metrics.db_time, view=view)
+
+    @property
+    def path(self):
+        return os.path.join(self.directory, f'{os.getpid()}.json')
+
+    def maybe_flush(self):
+        if time.monotonic() - self._flushed_at >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        with self._lock:
+            self._flushed_at = time.monotonic()
+            rows = [[name, labels, value]
+                    for (name, labels), value in self._values.items()]
+        os.makedirs(self.directory, exist_ok=True)
+        temporary = f'{self.path}.{get_ident()}.tmp'
+        with open(temporary, 'w') as file:
+            json.dump(rows, file)
+        os.replace(temporary, self.path)
+
+    def collect(self):
+        '''Сумма значений из файлов всех процессов.'''
+        self.flush()
+        values = defaultdict(float)
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, file_name)) as file:
+                    rows = json.load(file)
+            except (OSError, ValueError):
+                continue
+            for name, labels, value in rows:
+                values[name, tuple(map(tuple, labels))] += value
+        return values
+
+
+registry = MetricsRegistry(METRICS_DIR, METRICS_FLUSH_INTERVAL)
+
+
+def cache_ratios(values, extra_stats):
+    '''Дополняет значения обращениями к общим кэшам и долями попаданий.
+
+    extra_stats - {кэш: {'hits': n, 'misses': n}} для кэшей, чья
+    статистика уже общая для процессов.
+    '''
+    name = 'foodgram_cache_requests_total'
+    for cache_name, stats in extra_stats.items():
+        for result, count in (('hit', stats['hits']),
+                              ('miss', stats['misses'])):
+            values[name, (('cache', cache_name), ('result', result))] = count
+    totals = defaultdict(lambda: {'hit': 0, 'miss': 0})
+    for (metric, labels), value in list(values.items()):
+        if metric == name:
+            labels = dict(labels)
+            totals[labels['cache']][labels['result']] += value
+    for cache_name, counts in totals.items():
+        requests = counts['hit'] + counts['miss']
+        values['foodgram_cache_hit_ratio', (('cache', cache_name),)] = (
+            counts['hit'] / requests if requests else 0)
+    return values
+
+
+def format_value(value):
+    if value == float('inf'):
+        return '+Inf'
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def escape(value):
+    return (str(value).replace('\\', r'\\').replace('"', r'\"')
+            .replace('\n', r'\n'))
+
+
+def base_name(name):
+    for suffix in ('_bucket', '_sum', '_count'):
+        if name.endswith(suffix) and name[:-len(suffix)] in METRICS:
+            return name[:-len(suffix)]
+    return name
+
+
+def format_labels(labels):
+    return ','.join(
+        f'{key}="{escape(format_value(value) if key == "le" else value)}"'
+        for key, value in labels)
+
+
+def sort_key(row):
+    name, labels, _ = row
+    bound = dict(labels).get('le', 0)
+    return name, [(key, str(value)) for key, value in labels
+                  if key != 'le'], bound
+
+
+def render_prometheus(values):
+    '''Значения в текстовом формате Prometheus 0.0.4.'''
+    families = defaultdict(list)
+    for (name, labels), value in values.items():
+        families[base_name(name)].append((name, labels, value))
+    lines = []
+    for family in sorted(families):
+        kind, description = METRICS.get(family, ('untyped', family))
+        lines.append(f'# HELP {family} {description}')
+        lines.append(f'# TYPE {family} {kind}')
+        for name, labels, value in sorted(families[family], key=sort_key):
+            series = f'{name}{{{format_labels(labels)}}}' if labels else name
+            lines.append(f'{series} {format_value(value)}')
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,99 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+
+from django.db import connections
+
+from api.metrics import registry
+from api.timing import RequestMetrics, current_metrics
+from foodgram.settings import (DUPLICATE_QUERY_THRESHOLD,
+                               SERVER_TIMING_SAMPLE_RATE)
+
+logger = logging.getLogger('api.timing')
+
+
+def view_name(view_func, request):
+    '''Имя представления: для вьюсетов DRF - класс и действие.'''
+    cls = getattr(view_func, 'cls', None)
+    if cls is None:
+        return getattr(view_func, '__qualname__', repr(view_func))
+    actions = getattr(view_func, 'actions', None) or {}
+    action = actions.get(request.method.lower(), request.method.lower())
+    return f'{cls.__name__}.{action}'
+
+
+class ServerTimingMiddleware:
+    '''Замеры запроса в заголовке Server-Timing и в журнале api.timing.
+
+    Учитываются число SQL-запросов и время в базе, время сериализации,
+    рендеринга и общее время. Доля SERVER_TIMING_SAMPLE_RATE запросов
+    пишется в журнал одной JSON-строкой, повторы запросов от
+    DUPLICATE_QUERY_THRESHOLD раз пишутся всегда как признак N+1.
+    Замеры также попадают в реестр метрик для /api/metrics/.
+    '''
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        metrics = RequestMetrics()
+        token = current_metrics.set(metrics)
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(metrics.execute))
+                response = self.get_response(request)
+        finally:
+            current_metrics.reset(token)
+        response['Server-Timing'] = self.header(metrics)
+        registry.record_request(metrics.view or 'unresolved', request.method,
+                                response.status_code, metrics)
+        self.log(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        metrics = current_metrics.get()
+        if metrics is not None:
+            metrics.view = view_name(view_func, request)
+
+    @staticmethod
+    def header(metrics):
+        timings = [
+            ('db', metrics.db_time, f'{metrics.query_count} queries'),
+            *((name, duration, None)
+              for name, duration in metrics.durations.items()),
+            ('total', metrics.total, None),
+        ]
+        return ', '.join(
+            f'{name};dur={duration * 1000:.1f}'
+            + (f';desc="{desc}"' if desc else '')
+            for name, duration, desc in timings
+        )
+
+    @staticmethod
+    def log(request, response, metrics):
+        view = metrics.view or request.path
+        for sql, count in metrics.duplicates(DUPLICATE_QUERY_THRESHOLD):
+            logger.warning(json.dumps({
+                'event': 'duplicate_queries',
+                'view': view,
+                'path': request.path,
+                'count': count,
+                'sql': sql,
+            }, ensure_ascii=False))
+        if random.random() >= SERVER_TIMING_SAMPLE_RATE:
+            return
+        logger.info(json.dumps({
+            'event': 'request',
+            'view': view,
+            'method': request.method,
+            'path': request.path,
+            'status': response.status_code,
+            'queries': metrics.query_count,
+            'db_ms': round(metrics.db_time * 1000, 1),
+            **{f'{name}_ms': round(duration * 1000, 1)
+               for name, duration in metrics.durations.items()},
+            'total_ms': round(metrics.total * 1000, 1),
+        }, ensure_ascii=False))
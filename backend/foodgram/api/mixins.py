@@ -0,0 +1,49 @@
+import hashlib
+
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date, quote_etag
+
+from recipes.models import TableVersion
+
+
+class ConditionalGetMixin:
+    '''Условные GET-запросы (ETag и Last-Modified).
+
+    Наследник определяет get_validators(), возвращающий данные для ETag
+    и дату изменения (или None). Если клиент прислал актуальный ETag или
+    дату, ответ 304 отдаётся до вызова сериализатора.
+    '''
+
+    def get_validators(self):
+        raise NotImplementedError
+
+    def table_validators(self, *models):
+        '''Валидаторы по версиям таблиц и адресу запроса.
+
+        Прочитанные версии сохраняются в table_versions, чтобы обработчик
+        запроса не читал их повторно.
+        '''
+        versions = TableVersion.objects.current(
+            *(model._meta.label_lower for model in models))
+        self.table_versions = versions
+        last_modified = max(
+            (updated_at for _, updated_at in versions.values()),
+            default=None)
+        return ((self.request.get_full_path(), sorted(versions.items())),
+                last_modified)
+
+    def conditional_response(self, handler, request, *args, **kwargs):
+        etag_source, last_modified = self.get_validators()
+        etag = quote_etag(
+            hashlib.md5(repr(etag_source).encode()).hexdigest())
+        timestamp = (int(last_modified.timestamp())
+                     if last_modified is not None else None)
+        response = get_conditional_response(
+            request, etag=etag, last_modified=timestamp)
+        if response is None:
+            response = handler(request, *args, **kwargs)
+        if response.status_code in (200, 304):
+            response['ETag'] = etag
+            if timestamp is not None:
+                response['Last-Modified'] = http_date(timestamp)
+        return response
@@ -1,5 +1,109 @@
+import base64
+import binascii
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound, ValidationError
 from rest_framework.pagination import PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+def keyset_filter(ordering, values):
+    '''Условие "строго после values" для сортировки ordering.'''
+    condition, equal = Q(), Q()
+    for field, value in zip(ordering, values):
+        name = field.lstrip('-')
+        lookup = 'lt' if field.startswith('-') else 'gt'
+        condition |= equal & Q(**{f'{name}__{lookup}': value})
+        equal &= Q(**{name: value})
+    return condition
 
 
 class CustomPaginator(PageNumberPagination):
+    '''Постраничная пагинация с курсорным режимом.
+
+    Если в запросе есть параметр cursor (для первой страницы пустой),
+    страница выбирается по ключу сортировки view.cursor_ordering без
+    COUNT и OFFSET, а ответ содержит только next и results. Если
+    выборка уже отсортирована иначе (поиск), курсор отклоняется с 400.
+    '''
     page_size_query_param = 'limit'
+    cursor_query_param = 'cursor'
+    cursor_ordering = ('-id',)
+    invalid_cursor_message = 'Неверный курсор.'
+    invalid_ordering_message = 'Курсор нельзя использовать с этой сортировкой.'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.use_cursor = self.cursor_query_param in request.query_params
+        if not self.use_cursor:
+            return super().paginate_queryset(queryset, request, view)
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        self.request = request
+        ordering = getattr(view, 'cursor_ordering', self.cursor_ordering)
+        if queryset.query.order_by and (
+                tuple(queryset.query.order_by) != tuple(ordering)):
+            # Ключ курсора строится только по cursor_ordering, другую
+            # сортировку (например, по релевантности поиска) он потеряет.
+            raise ValidationError(
+                {self.cursor_query_param: self.invalid_ordering_message})
+        queryset = queryset.order_by(*ordering)
+        cursor = request.query_params[self.cursor_query_param]
+        if cursor:
+            queryset = queryset.filter(
+                keyset_filter(ordering, self.decode_cursor(
+                    cursor, queryset.model, ordering)))
+        page = list(queryset[:page_size + 1])
+        self.next_cursor = None
+        if len(page) > page_size:
+            page = page[:page_size]
+            self.next_cursor = self.encode_cursor([
+                getattr(page[-1], field.lstrip('-')) for field in ordering
+            ])
+        return page
+
+    def encode_cursor(self, values):
+        data = json.dumps(values, default=lambda value: value.isoformat())
+        return base64.urlsafe_b64encode(data.encode()).decode()
+
+    def decode_cursor(self, cursor, model, ordering):
+        '''Значения полей ordering из курсора, приведённые к типам модели.
+
+        На любой некорректный курсор отвечает 404, а не ошибкой сервера.
+        '''
+        try:
+            values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+            if not isinstance(values, list) or len(values) != len(ordering):
+                raise ValueError
+            values = [
+                model._meta.get_field(field.lstrip('-')).to_python(value)
+                for field, value in zip(ordering, values)
+            ]
+            if None in values:
+                raise ValueError
+        except (binascii.Error, TypeError, ValueError,
+                DjangoValidationError):
+            raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def get_next_link(self):
+        if not self.use_cursor:
+            return super().get_next_link()
+        if self.next_cursor is None:
+            return None
+        url = remove_query_param(
+            self.request.build_absolute_uri(), self.page_query_param)
+        return replace_query_param(
+            url, self.cursor_query_param, self.next_cursor)
+
+    def get_paginated_response(self, data):
+        if not self.use_cursor:
+            return super().get_paginated_response(data)
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data),
+        ]))
@@ -0,0 +1,93 @@
+import io
+from concurrent.futures import (BrokenExecutor, ProcessPoolExecutor,
+                                TimeoutError)
+from threading import Lock
+
+from reportlab.lib.pagesizes import A4
+from reportlab.pdfbase import pdfmetrics
+from reportlab.pdfbase.ttfonts import TTFont
+from reportlab.pdfgen import canvas
+
+from foodgram.settings import PDF_FONT_PATH, PDF_TIMEOUT, PDF_WORKERS
+
+FONT = 'DejaVuSans'
+MARGIN = 50
+LINE_HEIGHT = 18
+
+
+class PDFUnavailableError(Exception):
+    '''Пул не собрал PDF за PDF_TIMEOUT секунд или сломан.'''
+
+
+def build_shopping_list(rows, font_path):
+    '''PDF со списком покупок, выполняется в процессе пула.
+
+    rows - кортежи (название, количество, единица измерения). Шрифт
+    встраивается в документ, чтобы кириллица отображалась везде.
+    '''
+    if FONT not in pdfmetrics.getRegisteredFontNames():
+        pdfmetrics.registerFont(TTFont(FONT, font_path))
+    buffer = io.BytesIO()
+    pdf = canvas.Canvas(buffer, pagesize=A4)
+    top = A4[1] - MARGIN
+    pdf.setFont(FONT, 16)
+    pdf.drawString(MARGIN, top, 'Список покупок')
+    pdf.setFont(FONT, 12)
+    position = top - 2 * LINE_HEIGHT
+    for row in rows:
+        if position < MARGIN:
+            pdf.showPage()
+            pdf.setFont(FONT, 12)
+            position = top
+        pdf.drawString(MARGIN, position, '{} - {} {}.'.format(*row))
+        position -= LINE_HEIGHT
+    pdf.save()
+    return buffer.getvalue()
+
+
+class WorkerPool:
+    '''Пул процессов, который создаётся при первой задаче.
+
+    Так пул не создаётся в мастер-процессе gunicorn до форка воркеров.
+    '''
+
+    def __init__(self, workers):
+        self.workers = workers
+        self._lock = Lock()
+        self._executor = None
+
+    def submit(self, function, *args):
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self._executor.submit(function, *args)
+
+    def shutdown(self):
+        '''Останавливает процессы, следующая задача создаст новый пул.'''
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False)
+
+
+pool = WorkerPool(PDF_WORKERS)
+
+
+def render_shopping_list(rows):
+    '''Собирает PDF в отдельном процессе и ждёт результат.
+
+    Вёрстка PDF занимает процессор, поэтому не выполняется в воркере
+    gunicorn: он только передаёт строки в пул и ждёт не дольше
+    PDF_TIMEOUT секунд. Таймаут и сломанный пул превращаются в
+    PDFUnavailableError, ошибки самой вёрстки (например, шрифта) передаются
+    как есть.
+    '''
+    try:
+        return pool.submit(
+            build_shopping_list, list(rows), PDF_FONT_PATH,
+        ).result(timeout=PDF_TIMEOUT)
+    except TimeoutError as error:
+        raise PDFUnavailableError from error
+    except BrokenExecutor as error:
+        pool.shutdown()
+        raise PDFUnavailableError from error
@@ -0,0 +1,127 @@
+import csv
+import json
+
+from rest_framework.renderers import BaseRenderer, JSONRenderer
+
+from api.pdf import render_shopping_list
+from api.timing import timed
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class FastJSONRenderer(JSONRenderer):
+    '''JSON-рендерер на orjson с тем же форматом вывода, что у DRF.
+
+    Типы, которые orjson не умеет кодировать сам (Decimal, ленивые
+    строки, QuerySet), и даты передаются в кодировщик DRF. Если orjson
+    не установлен, запрошен отступ или данные ему не по силам, рендеринг
+    выполняет стандартный JSONRenderer.
+    '''
+    options = (orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME
+               if orjson else None)
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        with timed('render'):
+            return self.encode(data, accepted_media_type, renderer_context)
+
+    def encode(self, data, accepted_media_type, renderer_context):
+        if (orjson is None or data is None or not self.compact
+                or self.ensure_ascii or not self.strict
+                or self.get_indent(accepted_media_type,
+                                   renderer_context or {}) is not None):
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        try:
+            ret = orjson.dumps(
+                data, default=self.encoder_class().default,
+                option=self.options)
+        except orjson.JSONEncodeError:
+            return super().render(
+                data, accepted_media_type, renderer_context)
+        return ret.replace('\u2028'.encode(), b'\\u2028').replace(
+            '\u2029'.encode(), b'\\u2029')
+
+
+class Echo:
+    '''Буфер для csv.writer, возвращающий записанную строку.'''
+
+    def write(self, value):
+        return value
+
+
+class ShoppingListRenderer(BaseRenderer):
+    '''Базовый потоковый рендерер списка покупок.
+
+    Строки списка отдаются методом stream по одной (или методом build
+    целиком, если streaming = False), ответы с ошибками рендерятся в JSON.
+    '''
+    charset = 'utf-8'
+    streaming = True
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return FastJSONRenderer().render(data)
+
+    def stream(self, ingredients):
+        raise NotImplementedError
+
+    def build(self, ingredients):
+        '''Файл целиком, для форматов без потоковой отдачи.'''
+        raise NotImplementedError
+
+
+class TextShoppingListRenderer(ShoppingListRenderer):
+    '''Список покупок в виде текста.'''
+    media_type = 'text/plain'
+    format = 'txt'
+
+    def stream(self, ingredients):
+        yield 'Cписок покупок:'
+        for ingredient in ingredients:
+            yield '\n{} - {} {}.'.format(*ingredient)
+
+
+class CSVShoppingListRenderer(ShoppingListRenderer):
+    '''Список покупок в формате CSV.'''
+    media_type = 'text/csv'
+    format = 'csv'
+
+    def stream(self, ingredients):
+        writer = csv.writer(Echo())
+        yield writer.writerow(('name', 'amount', 'measurement_unit'))
+        for ingredient in ingredients:
+            yield writer.writerow(ingredient)
+
+
+class JSONShoppingListRenderer(ShoppingListRenderer):
+    '''Список покупок в формате JSON.'''
+    media_type = 'application/json'
+    format = 'json'
+
+    def stream(self, ingredients):
+        separator = '['
+        for name, amount, measurement_unit in ingredients:
+            yield separator + json.dumps({
+                'name': name,
+                'amount': amount,
+                'measurement_unit': measurement_unit,
+            }, ensure_ascii=False)
+            separator = ','
+        yield ']' if separator == ',' else '[]'
+
+
+class PDFShoppingListRenderer(ShoppingListRenderer):
+    '''Список покупок в PDF, собранный в процессе пула api.pdf.
+
+    PDF собирается до отправки заголовков, чтобы ошибка сборки
+    вернулась клиенту статусом ответа.
+    '''
+    media_type = 'application/pdf'
+    format = 'pdf'
+    charset = None
+    streaming = False
+
+    def build(self, ingredients):
+        return render_shopping_list(ingredients)
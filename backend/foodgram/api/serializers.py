@@ -1,16 +1,36 @@
+from operator import attrgetter
+
 from django.db import transaction
 from djoser.serializers import UserSerializer
-from drf_extra_fields.fields import Base64ImageField
 from rest_framework import serializers
 from rest_framework.fields import SerializerMethodField
-from rest_framework.serializers import ModelSerializer, PrimaryKeyRelatedField
+from rest_framework.serializers import ModelSerializer
+
+from api.compiled import CompiledListSerializer, compile_fields
+from api.fields import (Base64ImageUploadField, BatchedListSerializer,
+                        BatchedPrimaryKeyRelatedField, RecipeImageField)
+from api.timing import TimedListSerializer, TimedSerializerMixin
+from foodgram.settings import BULK_ACTION_LIMIT
+
+from recipes.models import (Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingListItem, Tag, delete_recipe_ingredients)
+from recipes.relations import relation_ids
+from users.models import User
+
 
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
-from users.models import Follow, User
+class BulkIdsSerializer(serializers.Serializer):
+    '''Список id для массовых действий.'''
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False, max_length=BULK_ACTION_LIMIT,
+        error_messages={
+            'max_length': 'Не больше {max_length} id за один запрос.'})
 
+    def validate_ids(self, value):
+        return list(dict.fromkeys(value))
 
-class UserBaseSerializer(UserSerializer):
+
+class UserBaseSerializer(TimedSerializerMixin, UserSerializer):
     '''Базовый сериализатор пользователя.'''
     is_subscribed = SerializerMethodField(read_only=True)
 
@@ -19,34 +39,37 @@ class UserBaseSerializer(UserSerializer):
         fields = ('email', 'id', 'username',
                   'first_name', 'last_name',
                   'is_subscribed')
+        list_serializer_class = TimedListSerializer
 
     def get_is_subscribed(self, obj):
-        user = self.context.get('request').user
-        return not user.is_anonymous and Follow.objects.filter(
-            user=user, author=obj).exists()
+        return obj.pk in relation_ids(self.context.get('request'), 'following')
 
 
-class IngredientSerializer(serializers.ModelSerializer):
+class IngredientSerializer(TimedSerializerMixin,
+                           serializers.ModelSerializer):
     '''Сериализатор ингредиентов.'''
     class Meta:
         model = Ingredient
         fields = ('id', 'name', 'measurement_unit')
+        list_serializer_class = CompiledListSerializer
 
 
-class TagSerializer(serializers.ModelSerializer):
+class TagSerializer(TimedSerializerMixin, serializers.ModelSerializer):
     '''Сериализатор тегов.'''
     class Meta:
         model = Tag
         fields = ('id', 'name', 'color', 'slug')
+        list_serializer_class = CompiledListSerializer
 
 
-class RecipeFastSerializer(ModelSerializer):
+class RecipeFastSerializer(TimedSerializerMixin, ModelSerializer):
     '''Сериализатор для отображения рецептов на странице подписок.'''
-    image = Base64ImageField()
+    image = RecipeImageField(variant='image_thumbnail')
 
     class Meta:
         model = Recipe
         fields = ('id', 'name', 'image', 'cooking_time')
+        list_serializer_class = TimedListSerializer
 
 
 class FollowSerializer(UserBaseSerializer):
@@ -59,21 +82,22 @@ class FollowSerializer(UserBaseSerializer):
         model = User
         fields = UserBaseSerializer.Meta.fields + ('recipes_count', 'recipes')
         read_only_fields = ('email', 'username', 'first_name', 'last_name')
+        list_serializer_class = TimedListSerializer
 
     def get_recipes_count(self, obj):
-        return obj.recipes.count()
+        return obj.recipes_count
 
     def get_recipes(self, obj):
         request = self.context.get('request')
-        recipes_limit = request.query_params.get('recipes_limit')
-        if not recipes_limit:
-            return RecipeFastSerializer(
-                Recipe.objects.filter(author=obj),
-                many=True,
-                context={'request': request}
-            ).data
+        if hasattr(obj, 'latest_recipes'):
+            recipes = obj.latest_recipes
+        else:
+            recipes_limit = request.query_params.get('recipes_limit')
+            recipes = Recipe.objects.filter(author=obj)
+            if recipes_limit:
+                recipes = recipes[:int(recipes_limit)]
         return RecipeFastSerializer(
-            Recipe.objects.filter(author=obj)[:int(recipes_limit)],
+            recipes,
             many=True,
             context={'request': request}
         ).data
@@ -81,7 +105,7 @@ class FollowSerializer(UserBaseSerializer):
 
 class IngredientInRecipeCreateSerializer(ModelSerializer):
     '''Сериализатор для отоброжения ингредиента при создании рецепта.'''
-    id = PrimaryKeyRelatedField(queryset=Ingredient.objects.all())
+    id = BatchedPrimaryKeyRelatedField(queryset=Ingredient.objects.all())
     name = serializers.ReadOnlyField(source='ingredient.name')
     measurement_unit = serializers.ReadOnlyField(
         source='ingredient.measurement_unit')
@@ -95,14 +119,17 @@ class IngredientInRecipeCreateSerializer(ModelSerializer):
         data['id'] = instance.ingredient.id
         return data
 
+    def compile(self):
+        return compile_fields(self, id=attrgetter('ingredient.id'))
+
 
-class RecipeReadSerializer(ModelSerializer):
+class RecipeReadSerializer(TimedSerializerMixin, ModelSerializer):
     '''Сериализатор получения рецепта.'''
     author = UserBaseSerializer(read_only=True)
     tags = TagSerializer(many=True, read_only=True)
     ingredients = IngredientInRecipeCreateSerializer(
         source='recipe_ingredients', many=True)
-    image = Base64ImageField()
+    image = RecipeImageField()
     is_favorited = SerializerMethodField(read_only=True)
     is_in_shopping_cart = SerializerMethodField(read_only=True)
 
@@ -110,26 +137,27 @@ class RecipeReadSerializer(ModelSerializer):
         model = Recipe
         fields = ('id', 'tags', 'author', 'ingredients',
                   'is_favorited', 'is_in_shopping_cart',
-                  'name', 'image', 'text', 'cooking_time')
+                  'name', 'image', 'image_thumbnail', 'image_webp',
+                  'text', 'cooking_time')
+        read_only_fields = ('image_thumbnail', 'image_webp')
+        list_serializer_class = CompiledListSerializer
 
     def get_is_favorited(self, obj):
-        user = self.context['request'].user
-        return not user.is_anonymous and Favorite.objects.filter(
-            user=user, recipe=obj).exists()
+        return obj.pk in relation_ids(self.context['request'], 'favorites')
 
     def get_is_in_shopping_cart(self, obj):
-        user = self.context['request'].user
-        return not user.is_anonymous and ShoppingCart.objects.filter(
-            user=user, recipe=obj).exists()
+        return obj.pk in relation_ids(
+            self.context['request'], 'shopping_cart')
 
 
-class RecipeCreateSerializer(ModelSerializer):
+class RecipeCreateSerializer(TimedSerializerMixin, ModelSerializer):
     '''Сериализатор создания рецепта.'''
-    tags = serializers.PrimaryKeyRelatedField(
+    tags = BatchedPrimaryKeyRelatedField(
         queryset=Tag.objects.all(), many=True)
     author = UserBaseSerializer(read_only=True)
-    ingredients = IngredientInRecipeCreateSerializer(many=True)
-    image = Base64ImageField()
+    ingredients = BatchedListSerializer(
+        child=IngredientInRecipeCreateSerializer())
+    image = Base64ImageUploadField()
 
     class Meta:
         model = Recipe
@@ -164,17 +192,24 @@ class RecipeCreateSerializer(ModelSerializer):
         return attrs
 
     def to_representation(self, instance):
+        instance = Recipe.objects.for_read().get(pk=instance.pk)
         return RecipeReadSerializer(
             instance, context={'request': self.context.get('request')}).data
 
     @transaction.atomic
     def update(self, instance, validated_data):
+        if 'image' in validated_data:
+            validated_data['image_status'] = Recipe.ImageStatus.PENDING
         if 'tags' in validated_data:
             instance.tags.set(validated_data.pop('tags'))
         if 'ingredients' in validated_data:
-            ingredients_data = validated_data.pop('ingredients')
-            instance.ingredients.clear()
-            self.create_ingredients(instance, ingredients_data)
+            amounts = self.update_ingredients(
+                instance, validated_data.pop('ingredients'))
+            if amounts:
+                ShoppingListItem.objects.change_amounts(
+                    instance.in_shopping_cart.values_list(
+                        'user_id', flat=True),
+                    amounts)
         return super().update(instance, validated_data)
 
     @transaction.atomic
@@ -186,6 +221,41 @@ class RecipeCreateSerializer(ModelSerializer):
         self.create_ingredients(recipe, ingredients)
         return recipe
 
+    def update_ingredients(self, recipe, ingredients_data):
+        '''Приводит ингредиенты рецепта к ingredients_data.
+
+        Добавляются только новые строки, меняются только изменившиеся
+        количества и удаляются только убранные ингредиенты.
+        Возвращает изменения количеств {ingredient_id: разница}.
+        '''
+        existing = {item.ingredient_id: item
+                    for item in recipe.recipe_ingredients.all()}
+        wanted = {ingredient_data['id'].id: ingredient_data['amount']
+                  for ingredient_data in ingredients_data}
+        created, changed, amounts = [], [], {}
+        for ingredient_id, amount in wanted.items():
+            item = existing.get(ingredient_id)
+            if item is None:
+                created.append(IngredientInRecipe(
+                    recipe=recipe, ingredient_id=ingredient_id,
+                    amount=amount))
+                amounts[ingredient_id] = amount
+            elif item.amount != amount:
+                amounts[ingredient_id] = amount - item.amount
+                item.amount = amount
+                changed.append(item)
+        removed = []
+        for ingredient_id, item in existing.items():
+            if ingredient_id not in wanted:
+                removed.append(item.pk)
+                amounts[ingredient_id] = -item.amount
+        delete_recipe_ingredients(removed)
+        if changed:
+            IngredientInRecipe.objects.bulk_update(changed, ['amount'])
+        if created:
+            IngredientInRecipe.objects.bulk_create(created)
+        return amounts
+
     @transaction.atomic
     def create_ingredients(self, recipe, ingredients_data):
         ingredients = []
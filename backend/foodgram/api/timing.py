@@ -0,0 +1,84 @@
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework import serializers
+
+current_metrics = ContextVar('current_metrics', default=None)
+
+
+class RequestMetrics:
+    '''Время и SQL-запросы одного HTTP-запроса.
+
+    Время этапов (serialize, render) накапливается в durations, для
+    вложенных вызовов одного этапа учитывается только внешний.
+    '''
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view = None
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.durations = defaultdict(float)
+        self._depth = Counter()
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def total(self):
+        return time.perf_counter() - self.started
+
+    def execute(self, execute, sql, params, many, context):
+        '''Обёртка connection.execute_wrapper для учёта запросов.'''
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db_time += time.perf_counter() - start
+            self.queries[sql] += 1
+
+    def duplicates(self, threshold):
+        '''Запросы, повторённые с разными параметрами не менее threshold раз.
+
+        Такой повтор обычно означает N+1 при обходе связанных объектов.
+        '''
+        return [(sql, count) for sql, count in self.queries.most_common()
+                if count >= threshold]
+
+    @contextmanager
+    def timed(self, name):
+        self._depth[name] += 1
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._depth[name] -= 1
+            if not self._depth[name]:
+                self.durations[name] += time.perf_counter() - start
+
+
+@contextmanager
+def timed(name):
+    '''Учитывает время блока как этап name текущего запроса.'''
+    metrics = current_metrics.get()
+    if metrics is None:
+        yield
+        return
+    with metrics.timed(name):
+        yield
+
+
+class TimedSerializerMixin:
+    '''Учитывает построение serializer.data как этап serialize.'''
+
+    @property
+    def data(self):
+        with timed('serialize'):
+            return super().data
+
+
+class TimedListSerializer(TimedSerializerMixin, serializers.ListSerializer):
+    '''ListSerializer с учётом времени сериализации.'''
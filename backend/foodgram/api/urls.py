@@ -11,6 +11,7 @@ router.register(
     r'ingredients', views.IngredientViewSet, basename='ingredients')
 
 urlpatterns = [
+    path('metrics/', views.MetricsView.as_view(), name='metrics'),
     path('', include(router.urls)),
     path(r'auth/', include('djoser.urls.authtoken')),
 ]
@@ -1,24 +1,54 @@
-from django.db.models import Sum
-from django.http import HttpResponse
+import os
+from collections import defaultdict
+
+from django.db import transaction
+from django.http import Http404, HttpResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
+from django.utils.cache import patch_vary_headers
 from django_filters.rest_framework import DjangoFilterBackend
 from djoser.views import UserViewSet
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import SAFE_METHODS, IsAuthenticated
+from rest_framework.permissions import (SAFE_METHODS, IsAdminUser,
+                                        IsAuthenticated)
 from rest_framework.response import Response
+from rest_framework.views import APIView
 
+from api.cache import recipe_list_cache
 from api.filters import NameSearchFilter, RecipeFilter
+from api.indexes import ingredient_index
+from api.metrics import cache_ratios, registry, render_prometheus
+from api.mixins import ConditionalGetMixin
 from api.pagination import CustomPaginator
+from api.pdf import PDFUnavailableError
 from api.permissions import IsAdminOrReadOnly, IsAuthorOrReadOnly
-from api.serializers import (FollowSerializer, IngredientSerializer,
-                             RecipeCreateSerializer, RecipeFastSerializer,
-                             RecipeReadSerializer, TagSerializer,
-                             UserBaseSerializer)
+from api.renderers import (CSVShoppingListRenderer, JSONShoppingListRenderer,
+                           PDFShoppingListRenderer, TextShoppingListRenderer)
+from api.serializers import (BulkIdsSerializer, FollowSerializer,
+                             IngredientSerializer, RecipeCreateSerializer,
+                             RecipeFastSerializer, RecipeReadSerializer,
+                             TagSerializer, UserBaseSerializer)
 from foodgram.settings import FILE_NAME
-from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
-                            ShoppingCart, Tag)
-from users.models import Follow, User
+from recipes.models import Ingredient, Recipe, ShoppingListItem, Tag
+from recipes.relations import add_relations, relation_ids, remove_relations
+from users.models import User
+
+
+def bulk_response(ids, done, done_status, failures):
+    '''Результаты массового действия для каждого id в порядке запроса.
+
+    done - id, для которых действие выполнено, failures - словарь
+    {id: (статус, сообщение)}. Остальные id считаются ненайденными.
+    '''
+    results = []
+    for pk in ids:
+        if pk in done:
+            results.append({'id': pk, 'status': done_status})
+            continue
+        code, message = failures.get(
+            pk, (status.HTTP_404_NOT_FOUND, 'Не найдено.'))
+        results.append({'id': pk, 'status': code, 'errors': message})
+    return Response({'results': results})
 
 
 class UserBaseViewSet(UserViewSet):
@@ -33,6 +63,13 @@ class UserBaseViewSet(UserViewSet):
         user = request.user
         queryset = User.objects.filter(following__user=user)
         page = self.paginate_queryset(queryset)
+        recipes_limit = request.query_params.get('recipes_limit')
+        latest_recipes = defaultdict(list)
+        for recipe in Recipe.objects.latest_for_authors(
+                page, int(recipes_limit) if recipes_limit else None):
+            latest_recipes[recipe.author_id].append(recipe)
+        for author in page:
+            author.latest_recipes = latest_recipes[author.id]
         serializer = FollowSerializer(page,
                                       many=True,
                                       context={'request': request})
@@ -43,25 +80,51 @@ class UserBaseViewSet(UserViewSet):
             permission_classes=[IsAuthenticated])
     def subscribe(self, request, id):
         user = request.user
-        author = get_object_or_404(User, id=id)
 
         if request.method == 'POST':
+            author = get_object_or_404(User, id=id)
             if user.id == author.id:
                 return Response({'detail': 'Нельзя подписаться на себя'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            if Follow.objects.filter(author=author, user=user).exists():
+            if not add_relations('following', user.id, [author.id]):
                 return Response({'detail': 'Вы уже подписаны!'},
                                 status=status.HTTP_400_BAD_REQUEST)
-            Follow.objects.create(user=user, author=author)
             serializer = FollowSerializer(author, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        subscription = get_object_or_404(Follow, user=user, author=author)
-        subscription.delete()
+        if not remove_relations('following', user.id, [id]):
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='subscribe',
+            url_name='subscribe-bulk',
+            permission_classes=[IsAuthenticated])
+    def subscribe_bulk(self, request):
+        user = request.user
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+
+        if request.method == 'DELETE':
+            removed = remove_relations('following', user.id, ids)
+            return bulk_response(
+                ids, set(removed), status.HTTP_204_NO_CONTENT, {})
+
+        authors = [pk for pk in ids if pk != user.id]
+        created = set(add_relations('following', user.id, authors))
+        failures = {
+            user.id: (status.HTTP_400_BAD_REQUEST,
+                      'Нельзя подписаться на себя'),
+        }
+        for pk in User.objects.filter(
+                pk__in=set(authors) - created).values_list('pk', flat=True):
+            failures[pk] = (status.HTTP_400_BAD_REQUEST, 'Вы уже подписаны!')
+        return bulk_response(ids, created, status.HTTP_201_CREATED, failures)
+
 
-class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Ingredient.objects.all()
     serializer_class = IngredientSerializer
     permission_classes = (IsAdminOrReadOnly,)
@@ -69,76 +132,268 @@ class IngredientViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ('^name',)
     pagination_class = None
 
+    def get_validators(self):
+        return self.table_validators(Ingredient)
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(self.search, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
+
+    def search(self, request, *args, **kwargs):
+        name = request.query_params.get(NameSearchFilter.search_param)
+        if not name:
+            return super().list(request, *args, **kwargs)
+        version, _ = self.table_versions.get(
+            Ingredient._meta.label_lower, (0, None))
+        return Response(ingredient_index.search(name, version))
+
+
+class TagViewSet(ConditionalGetMixin, viewsets.ReadOnlyModelViewSet):
     queryset = Tag.objects.all()
     serializer_class = TagSerializer
     permission_classes = (IsAdminOrReadOnly,)
     pagination_class = None
 
+    def get_validators(self):
+        return self.table_validators(Tag)
+
+    def list(self, request, *args, **kwargs):
+        return self.conditional_response(super().list, request,
+                                         *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.conditional_response(super().retrieve, request,
+                                         *args, **kwargs)
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(ConditionalGetMixin, viewsets.ModelViewSet):
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrReadOnly,)
     pagination_class = CustomPaginator
+    cursor_ordering = ('-pub_date', '-id')
     filter_backends = (DjangoFilterBackend, )
     filterset_class = RecipeFilter
     http_method_names = [
         m for m in viewsets.ModelViewSet.http_method_names if m not in ['put']
     ]
 
+    def get_queryset(self):
+        if self.request.method in SAFE_METHODS:
+            return Recipe.objects.for_read()
+        return Recipe.objects.all()
+
     def get_serializer_class(self):
         if self.request.method in SAFE_METHODS:
             return RecipeReadSerializer
         return RecipeCreateSerializer
 
+    def get_validators(self):
+        user = self.request.user
+        pk, updated_at, author_id, author_updated_at = get_object_or_404(
+            Recipe.objects.values_list(
+                'pk', 'updated_at', 'author_id', 'author__updated_at'),
+            pk=self.kwargs['pk'])
+        flags = (
+            pk in relation_ids(self.request, 'favorites'),
+            pk in relation_ids(self.request, 'shopping_cart'),
+            author_id in relation_ids(self.request, 'following'),
+        )
+        versions, last_modified = self.table_validators(Tag, Ingredient)
+        if user.is_authenticated:
+            last_modified = None
+        else:
+            last_modified = max(
+                date for date in (last_modified, updated_at,
+                                  author_updated_at) if date is not None)
+        return ((versions, updated_at, author_updated_at, flags, user.id),
+                last_modified)
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action == 'list':
+            context['image_variant'] = 'image_thumbnail'
+        return context
+
+    def list(self, request, *args, **kwargs):
+        if 'ids' in request.query_params:
+            return self.batch(request)
+        if (not request.user.is_anonymous
+                or request.accepted_renderer.format != 'json'):
+            return super().list(request, *args, **kwargs)
+        entry = recipe_list_cache.get(request)
+        if entry is not None:
+            return recipe_list_cache.response(request, entry, 'HIT')
+        snapshot = recipe_list_cache.generations({'recipes'})
+        response = super().list(request, *args, **kwargs)
+        if response.status_code != status.HTTP_200_OK:
+            return response
+        body = request.accepted_renderer.render(
+            response.data, request.accepted_media_type,
+            self.get_renderer_context())
+        tags = {'recipes'} | {
+            f'user:{recipe["author"]["id"]}'
+            for recipe in response.data['results'] if recipe['author']
+        }
+        entry = recipe_list_cache.set(request, body, tags, snapshot)
+        return recipe_list_cache.response(request, entry, 'MISS')
+
+    def batch(self, request):
+        '''Рецепты по списку ?ids=1,2,3 в порядке запроса без пагинации.
+
+        Отсутствующие рецепты пропускаются, число id ограничено
+        BULK_ACTION_LIMIT.
+        '''
+        serializer = BulkIdsSerializer(
+            data={'ids': request.query_params['ids'].split(',')})
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        recipes = {
+            recipe.pk: recipe for recipe in self.filter_queryset(
+                self.get_queryset()).filter(pk__in=ids)
+        }
+        serializer = self.get_serializer(
+            [recipes[pk] for pk in ids if pk in recipes], many=True)
+        return Response(serializer.data)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = self.conditional_response(super().retrieve, request,
+                                             *args, **kwargs)
+        patch_vary_headers(response, ('Authorization',))
+        return response
+
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
-    def manage_object(self, request, model, model_name, pk=None):
+    def manage_object(self, request, relation, model_name, pk=None):
         user = request.user
-        recipe = get_object_or_404(Recipe, pk=pk)
+        in_cart = relation == 'shopping_cart'
 
         if request.method == 'POST':
-            if model.objects.filter(user=user, recipe=recipe).exists():
-                return Response({'errors': f'{model_name} уже существует'},
-                                status=status.HTTP_400_BAD_REQUEST)
-            model.objects.create(user=user, recipe=recipe)
+            recipe = get_object_or_404(Recipe, pk=pk)
+            with transaction.atomic():
+                if not add_relations(relation, user.id, [recipe.pk]):
+                    return Response(
+                        {'errors': f'{model_name} уже существует'},
+                        status=status.HTTP_400_BAD_REQUEST)
+                if in_cart:
+                    ShoppingListItem.objects.add_recipe([user.id], recipe)
             serializer = RecipeFastSerializer(
                 recipe, context={'request': request})
             return Response(serializer.data, status=status.HTTP_201_CREATED)
 
-        instance = get_object_or_404(model, user=user, recipe=recipe)
-        instance.delete()
+        with transaction.atomic():
+            removed = remove_relations(relation, user.id, [pk])
+            if removed and in_cart:
+                ShoppingListItem.objects.remove_recipe(
+                    [user.id], Recipe(pk=removed[0]))
+        if not removed:
+            raise Http404
         return Response(status=status.HTTP_204_NO_CONTENT)
 
+    @transaction.atomic
+    def manage_objects(self, request, relation, model_name):
+        user = request.user
+        serializer = BulkIdsSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        in_cart = relation == 'shopping_cart'
+
+        if request.method == 'DELETE':
+            removed = remove_relations(relation, user.id, ids)
+            if in_cart:
+                ShoppingListItem.objects.remove_recipes([user.id], removed)
+            return bulk_response(
+                ids, set(removed), status.HTTP_204_NO_CONTENT, {})
+
+        created = add_relations(relation, user.id, ids)
+        if in_cart:
+            ShoppingListItem.objects.add_recipes([user.id], created)
+        created = set(created)
+        failures = {
+            pk: (status.HTTP_400_BAD_REQUEST, f'{model_name} уже существует')
+            for pk in Recipe.objects.filter(
+                pk__in=set(ids) - created).values_list('pk', flat=True)
+        }
+        return bulk_response(ids, created, status.HTTP_201_CREATED, failures)
+
     @action(detail=True,
             methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def favorite(self, request, pk=None):
-        return self.manage_object(request, Favorite, 'Рецепт', pk)
+        return self.manage_object(request, 'favorites', 'Рецепт', pk)
 
     @action(detail=True,
             methods=['post', 'delete'],
             permission_classes=[IsAuthenticated])
     def shopping_cart(self, request, pk=None):
-        return self.manage_object(request, ShoppingCart, 'Список покупок', pk)
+        return self.manage_object(
+            request, 'shopping_cart', 'Список покупок', pk)
+
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='favorite',
+            url_name='favorite-bulk',
+            permission_classes=[IsAuthenticated])
+    def favorite_bulk(self, request):
+        return self.manage_objects(request, 'favorites', 'Рецепт')
+
+    @action(detail=False,
+            methods=['post', 'delete'],
+            url_path='shopping_cart',
+            url_name='shopping-cart-bulk',
+            permission_classes=[IsAuthenticated])
+    def shopping_cart_bulk(self, request):
+        return self.manage_objects(
+            request, 'shopping_cart', 'Список покупок')
 
     @action(detail=False, methods=['get'],
-            permission_classes=(IsAuthenticated,))
+            permission_classes=(IsAuthenticated,),
+            renderer_classes=(TextShoppingListRenderer,
+                              CSVShoppingListRenderer,
+                              JSONShoppingListRenderer,
+                              PDFShoppingListRenderer))
     def download_shopping_cart(self, request, **kwargs):
         ingredients = (
-            IngredientInRecipe.objects
-            .filter(recipe__in_shopping_cart__user=request.user)
-            .values('ingredient')
-            .annotate(total_amount=Sum('amount'))
+            ShoppingListItem.objects
+            .filter(user=request.user)
+            .order_by('ingredient__name')
             .values_list('ingredient__name', 'total_amount',
                          'ingredient__measurement_unit')
+            .iterator()
         )
-        file_list = []
-        [file_list.append(
-            '{} - {} {}.'.format(*ingredient)) for ingredient in ingredients]
-        file = HttpResponse('Cписок покупок:\n' + '\n'.join(file_list),
-                            content_type='text/plain')
-        file['Content-Disposition'] = (f'attachment; filename={FILE_NAME}')
+        renderer = request.accepted_renderer
+        content_type = renderer.media_type
+        if renderer.charset:
+            content_type = f'{content_type}; charset={renderer.charset}'
+        if renderer.streaming:
+            file = StreamingHttpResponse(
+                renderer.stream(ingredients), content_type=content_type)
+        else:
+            try:
+                file = HttpResponse(
+                    renderer.build(ingredients), content_type=content_type)
+            except PDFUnavailableError:
+                return Response(
+                    {'errors': 'Не удалось собрать файл, попробуйте позже.'},
+                    status=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    content_type='application/json')
+        file_name = f'{os.path.splitext(FILE_NAME)[0]}.{renderer.format}'
+        file['Content-Disposition'] = (f'attachment; filename={file_name}')
         return file
+
+
+class MetricsView(APIView):
+    '''Метрики всех воркеров в формате Prometheus, только для админа.'''
+    permission_classes = (IsAdminUser,)
+
+    def get(self, request):
+        values = cache_ratios(registry.collect(), {
+            'recipe_list': recipe_list_cache.stats(),
+        })
+        return HttpResponse(
+            render_prometheus(values),
+            content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from pathlib import Path
 
 from dotenv import load_dotenv
@@ -46,6 +47,7 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'api.middleware.ServerTimingMiddleware',
 ]
 
 ROOT_URLCONF = 'foodgram.urls'
@@ -80,6 +82,18 @@ DATABASES = {
     }
 }
 
+# Поколения кэша ответов, кэш токенов и связей пользователей общие для
+# всех процессов (gunicorn, process_images), поэтому в docker-compose
+# используется memcached. LocMemCache подходит только для одного процесса.
+CACHES = {
+    'default': {
+        'BACKEND': os.getenv(
+            'CACHE_BACKEND',
+            default='django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.getenv('CACHE_LOCATION', default=''),
+    }
+}
+
 AUTH_USER_MODEL = 'users.User'
 
 
@@ -120,7 +134,16 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [
-        'rest_framework.authentication.TokenAuthentication',
+        'api.authentication.CachedTokenAuthentication',
+    ],
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.FastJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
+    'DEFAULT_PARSER_CLASSES': [
+        'api.parsers.FastJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
     ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
@@ -158,3 +181,56 @@ DJOSER = {
 EMPTY_VALUE_DISPLAY = '-пусто-'
 
 FILE_NAME = 'go_shopping.txt'
+
+PDF_FONT_PATH = os.getenv(
+    'PDF_FONT_PATH',
+    default='/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf')
+
+PDF_WORKERS = 2
+
+PDF_TIMEOUT = 30
+
+INGREDIENT_SEARCH_LIMIT = 50
+
+RECIPE_THUMBNAIL_SIZE = (480, 480)
+
+RECIPE_WEBP_MAX_SIZE = (1280, 1280)
+
+RELATION_CACHE_TIMEOUT = 300
+
+RESPONSE_CACHE_TIMEOUT = 600
+
+RESPONSE_CACHE_COMPRESS = True
+
+BULK_ACTION_LIMIT = 100
+
+TOKEN_CACHE_SIZE = 10000
+
+TOKEN_CACHE_TTL = 60
+
+TOKEN_CACHE_SHARED = True
+
+SERVER_TIMING_SAMPLE_RATE = float(
+    os.getenv('SERVER_TIMING_SAMPLE_RATE', default=0.01))
+
+DUPLICATE_QUERY_THRESHOLD = 5
+
+METRICS_DIR = os.getenv(
+    'METRICS_DIR',
+    default=os.path.join(tempfile.gettempdir(), 'foodgram-metrics'))
+
+METRICS_FLUSH_INTERVAL = 5
+
+METRICS_LATENCY_BUCKETS = (
+    0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'api.timing': {'handlers': ['console'], 'level': 'INFO'},
+    },
+}
@@ -23,7 +23,9 @@ class IngredientAdmin(admin.ModelAdmin):
 
 @admin.register(Recipe)
 class RecipeAdmin(admin.ModelAdmin):
-    list_display = ('name', 'id', 'author',)
+    list_display = ('name', 'id', 'author', 'favorites_count',
+                    'in_carts_count',)
+    readonly_fields = ('favorites_count', 'in_carts_count',)
 
 
 @admin.register(IngredientInRecipe)
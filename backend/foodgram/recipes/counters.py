@@ -0,0 +1,86 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+class ProtectedFieldsMixin:
+    """Не перезаписывает protected_fields при обычном сохранении.
+
+    Счётчики меняются UPDATE с F(), а служебные столбцы - фоновыми
+    задачами, поэтому значение в памяти могло устареть. При save() без
+    update_fields у загруженного объекта такие поля записываются, только
+    если изменились с момента загрузки.
+    """
+    protected_fields = ()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_protected = {
+            name: value for name, value in zip(field_names, values)
+            if name in cls.protected_fields
+        }
+        return instance
+
+    def save(self, *args, **kwargs):
+        loaded = getattr(self, '_loaded_protected', None)
+        if (loaded is not None and not self._state.adding
+                and kwargs.get('update_fields') is None):
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and (
+                    field.name not in self.protected_fields
+                    or field.name in loaded and field.get_prep_value(
+                        getattr(self, field.attname)) != loaded[field.name])
+            ]
+        super().save(*args, **kwargs)
+        self._loaded_protected = {
+            field.name: field.get_prep_value(getattr(self, field.attname))
+            for field in map(self._meta.get_field, self.protected_fields)
+        }
+
+
+def change_counter(model, pk, counter, delta):
+    """Атомарно меняет счётчик объекта на delta (не ниже нуля)."""
+    if pk is None:
+        return
+    model.objects.filter(pk=pk).update(
+        **{counter: Greatest(F(counter) + delta, 0)})
+
+
+def change_counters(model, pks, counter, delta):
+    """Меняет счётчики нескольких объектов на delta одним UPDATE."""
+    if not pks:
+        return
+    model.objects.filter(pk__in=pks).update(
+        **{counter: Greatest(F(counter) + delta, 0)})
+
+
+def actual_count(related_model, field):
+    """Подзапрос с настоящим количеством связанных строк."""
+    return Coalesce(
+        Subquery(
+            related_model.objects
+            .filter(**{field: OuterRef('pk')})
+            .order_by()
+            .values(field)
+            .annotate(total=Count('pk'))
+            .values('total'),
+            output_field=IntegerField(),
+        ),
+        0,
+    )
+
+
+def reconcile_counter(model, counter, related_model, field, apply=True):
+    """Находит и исправляет расхождения счётчика с COUNT.
+
+    Возвращает количество объектов с неверным значением.
+    """
+    drifted = model.objects.annotate(
+        actual=actual_count(related_model, field)
+    ).exclude(**{counter: F('actual')})
+    count = drifted.count()
+    if apply and count:
+        model.objects.filter(pk__in=drifted.values('pk')).update(
+            **{counter: actual_count(related_model, field)})
+    return count
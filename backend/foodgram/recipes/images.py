@@ -0,0 +1,55 @@
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from foodgram.settings import RECIPE_THUMBNAIL_SIZE, RECIPE_WEBP_MAX_SIZE
+
+
+def image_content(image, size, image_format, **options):
+    """Уменьшенная копия изображения в заданном формате."""
+    copy = image.copy()
+    copy.thumbnail(size)
+    buffer = BytesIO()
+    copy.save(buffer, image_format, **options)
+    return ContentFile(buffer.getvalue())
+
+
+def process_recipe_image(recipe):
+    """Проверяет изображение рецепта и создаёт его копии.
+
+    Создаются миниатюра в JPEG и копия в WebP. Если файл не удаётся
+    прочитать как изображение, он удаляется, а рецепт помечается как
+    рецепт с ошибкой обработки.
+    """
+    fields = ['image_status', 'image_thumbnail', 'image_webp', 'updated_at']
+    recipe.image_thumbnail.delete(save=False)
+    recipe.image_webp.delete(save=False)
+    if not recipe.image:
+        recipe.image_status = recipe.ImageStatus.READY
+        recipe.save(update_fields=fields)
+        return
+    try:
+        with recipe.image.open('rb') as file:
+            image = ImageOps.exif_transpose(Image.open(file))
+            image.load()
+    except (OSError, ValueError, Image.DecompressionBombError):
+        recipe.image.delete(save=False)
+        recipe.image_status = recipe.ImageStatus.FAILED
+        recipe.save(update_fields=fields + ['image'])
+        return
+    name = os.path.splitext(os.path.basename(recipe.image.name))[0]
+    recipe.image_thumbnail.save(
+        f'{name}.jpg',
+        image_content(image.convert('RGB'), RECIPE_THUMBNAIL_SIZE, 'JPEG',
+                      quality=85, optimize=True),
+        save=False,
+    )
+    recipe.image_webp.save(
+        f'{name}.webp',
+        image_content(image, RECIPE_WEBP_MAX_SIZE, 'WEBP', quality=80),
+        save=False,
+    )
+    recipe.image_status = recipe.ImageStatus.READY
+    recipe.save(update_fields=fields)
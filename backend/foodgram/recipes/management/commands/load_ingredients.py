@@ -1,33 +1,67 @@
 import csv
+import json
 import os
+import time
 
-from django.core.management.base import BaseCommand
-from progress.bar import IncrementalBar
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
 
 from foodgram import settings
-from recipes.models import Ingredient
+from recipes.models import Ingredient, TableVersion
 
 
-def ingredient_create(row):
-    Ingredient.objects.get_or_create(
-        name=row[0],
-        measurement_unit=row[1]
-    )
+def read_csv(file):
+    for row in csv.reader(file):
+        if row:
+            yield row[0], row[1]
+
+
+def read_json(file):
+    for item in json.load(file):
+        yield item['name'], item['measurement_unit']
+
+
+READERS = {
+    '.csv': read_csv,
+    '.json': read_json,
+}
 
 
 class Command(BaseCommand):
     help = "Загрузка ингредиетов в базу данных"
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--path',
+            default=os.path.join(settings.BASE_DIR, 'ingredients.csv'),
+            help='Файл с ингредиентами (.csv или .json)',
+        )
+        parser.add_argument('--batch-size', type=int, default=1000)
+
     def handle(self, *args, **options):
-        path = os.path.join(settings.BASE_DIR, 'ingredients.csv')
-        with open(path, 'r', encoding='utf-8') as file:
-            row_count = sum(1 for row in file)
-        with open(path, 'r', encoding='utf-8') as file:
-            reader = csv.reader(file)
-            bar = IncrementalBar('ingredients.csv'.ljust(17), max=row_count)
-            next(reader)
-            for row in reader:
-                bar.next()
-                ingredient_create(row)
-            bar.finish()
-        self.stdout.write("Ингредиенты были успешно добавлены!")
+        path = options['path']
+        reader = READERS.get(os.path.splitext(path)[1].lower())
+        if reader is None:
+            raise CommandError("Поддерживаются только файлы .csv и .json")
+        start = time.perf_counter()
+        with transaction.atomic():
+            existing = set(Ingredient.objects.values_list(
+                'name', 'measurement_unit'))
+            skipped = 0
+            new = []
+            with open(path, 'r', encoding='utf-8') as file:
+                for pair in reader(file):
+                    if pair in existing:
+                        skipped += 1
+                        continue
+                    existing.add(pair)
+                    new.append(Ingredient(
+                        name=pair[0], measurement_unit=pair[1]))
+            Ingredient.objects.bulk_create(
+                new, batch_size=options['batch_size'])
+            if new:
+                TableVersion.objects.bump(Ingredient._meta.label_lower)
+        self.stdout.write(
+            f"Ингредиенты загружены: добавлено {len(new)}, "
+            f"пропущено {skipped} за {time.perf_counter() - start:.2f} с"
+        )
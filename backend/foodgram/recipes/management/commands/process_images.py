@@ -0,0 +1,41 @@
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.images import process_recipe_image
+from recipes.models import Recipe
+
+
+def process_pending(batch_size):
+    with transaction.atomic():
+        recipes = list(
+            Recipe.objects
+            .select_for_update(skip_locked=True)
+            .filter(image_status=Recipe.ImageStatus.PENDING)
+            .order_by('updated_at')[:batch_size]
+        )
+        for recipe in recipes:
+            process_recipe_image(recipe)
+    return len(recipes)
+
+
+class Command(BaseCommand):
+    help = "Обработка загруженных изображений рецептов"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true',
+                            help='Обработать очередь один раз и выйти')
+        parser.add_argument('--interval', type=float, default=2,
+                            help='Пауза между опросами пустой очереди, с')
+        parser.add_argument('--batch-size', type=int, default=10)
+
+    def handle(self, *args, **options):
+        while True:
+            processed = process_pending(options['batch_size'])
+            if processed:
+                self.stdout.write(f"Обработано изображений: {processed}")
+                continue
+            if options['once']:
+                return
+            time.sleep(options['interval'])
@@ -0,0 +1,50 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from recipes.models import ShoppingListItem
+
+
+def find_mismatches():
+    live = {
+        (row['user'], row['ingredient']): row['total_amount']
+        for row in ShoppingListItem.objects.live().iterator()
+    }
+    stored = {
+        (user_id, ingredient_id): total_amount
+        for user_id, ingredient_id, total_amount in (
+            ShoppingListItem.objects
+            .values_list('user_id', 'ingredient_id', 'total_amount')
+            .iterator()
+        )
+    }
+    return {
+        key: (stored.get(key), live.get(key))
+        for key in live.keys() | stored.keys()
+        if stored.get(key) != live.get(key)
+    }
+
+
+class Command(BaseCommand):
+    help = "Пересборка и проверка суммарных списков покупок"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только сверить списки с корзинами, не пересобирая их',
+        )
+
+    def handle(self, *args, **options):
+        if not options['check']:
+            with transaction.atomic():
+                created = ShoppingListItem.objects.rebuild()
+            self.stdout.write(f"Списки покупок пересобраны: {created} строк")
+        mismatches = find_mismatches()
+        for (user_id, ingredient_id), (stored, live) in mismatches.items():
+            self.stderr.write(
+                f"user={user_id} ingredient={ingredient_id}: "
+                f"в таблице {stored}, по корзинам {live}"
+            )
+        if mismatches:
+            raise CommandError(f"Расхождений: {len(mismatches)}")
+        self.stdout.write("Списки покупок совпадают с корзинами")
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from recipes.counters import reconcile_counter
+from recipes.signals import COUNTERS
+
+
+class Command(BaseCommand):
+    help = "Сверка и исправление денормализованных счётчиков"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Только показать расхождения, не исправляя их',
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            for model, target, field, counter in COUNTERS:
+                drifted = reconcile_counter(
+                    target, counter, model, field,
+                    apply=not options['check'])
+                self.stdout.write(
+                    f"{target._meta.label}.{counter}: расхождений {drifted}")
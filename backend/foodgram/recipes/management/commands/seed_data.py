@@ -0,0 +1,272 @@
+import io
+import random
+import time
+from itertools import accumulate, islice
+
+from django.contrib.auth.hashers import make_password
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import AutoField
+from django.utils import timezone
+
+from recipes.counters import reconcile_counter
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, TableVersion, Tag)
+from recipes.search import rebuild_index
+from recipes.signals import COUNTERS
+from users.models import Follow, User
+
+WORDS = (
+    'борщ', 'суп', 'салат', 'пирог', 'курица', 'говядина', 'рыба',
+    'картофель', 'свёкла', 'капуста', 'морковь', 'лук', 'чеснок', 'сыр',
+    'грибы', 'рис', 'гречка', 'паста', 'соус', 'тесто', 'сметана',
+    'запечённый', 'жареный', 'тушёный', 'домашний', 'острый', 'сладкий',
+    'быстрый', 'праздничный', 'летний', 'зимний', 'классический',
+)
+
+DEFAULT_TAGS = (
+    ('Завтрак', '#E26C2D', 'breakfast'),
+    ('Обед', '#49B64E', 'lunch'),
+    ('Ужин', '#8775D2', 'dinner'),
+)
+
+
+def copy_value(value):
+    '''Значение в текстовом формате COPY PostgreSQL.'''
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    return (str(value).replace('\\', '\\\\').replace('\t', '\\t')
+            .replace('\n', '\\n').replace('\r', '\\r'))
+
+
+def default_value(field, now):
+    '''Значение поля для строки, в которой оно не задано.'''
+    if getattr(field, 'auto_now', False) or getattr(
+            field, 'auto_now_add', False):
+        value = now
+    elif field.has_default():
+        value = field.get_default()
+    elif field.blank and field.empty_strings_allowed and not field.null:
+        value = ''
+    else:
+        return None
+    return field.get_db_prep_save(value, connection)
+
+
+def insert(model, rows, batch_size):
+    '''Быстрая вставка строк без создания объектов модели и сигналов.
+
+    rows - словари {attname: значение}, остальные поля получают значения
+    по умолчанию. На PostgreSQL строки передаются командой COPY, на
+    остальных базах - через executemany пачками по batch_size.
+    Возвращает число строк.
+    '''
+    fields = [field for field in model._meta.local_concrete_fields
+              if not isinstance(field, AutoField)]
+    now = timezone.now()
+    defaults = [(field.attname, default_value(field, now))
+                for field in fields]
+    values = (tuple(row.get(name, default) for name, default in defaults)
+              for row in rows)
+    table = connection.ops.quote_name(model._meta.db_table)
+    columns = ', '.join(
+        connection.ops.quote_name(field.column) for field in fields)
+    count = 0
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            buffer = io.StringIO()
+            for row in values:
+                buffer.write('\t'.join(map(copy_value, row)) + '\n')
+                count += 1
+            buffer.seek(0)
+            cursor.copy_expert(
+                f'COPY {table} ({columns}) FROM STDIN', buffer)
+            return count
+        sql = (f'INSERT INTO {table} ({columns}) '
+               f'VALUES ({", ".join(["%s"] * len(fields))})')
+        while True:
+            batch = list(islice(values, batch_size))
+            if not batch:
+                return count
+            cursor.executemany(sql, batch)
+            count += len(batch)
+
+
+class Sampler:
+    '''Выбор объектов с перекосом популярности (закон Ципфа).
+
+    Вес объекта с рангом r равен 1 / r ** skew, при skew = 0 выбор
+    равномерный.
+    '''
+
+    def __init__(self, generator, population, skew):
+        self.generator = generator
+        self.population = list(population)
+        self.cum_weights = list(accumulate(
+            1 / rank ** skew for rank in range(1, len(self.population) + 1)))
+
+    def one(self):
+        return self.generator.choices(
+            self.population, cum_weights=self.cum_weights)[0]
+
+    def distinct(self, count, exclude=None):
+        '''До count разных объектов, кроме exclude.'''
+        count = min(count, len(self.population) - (exclude is not None))
+        chosen = set()
+        attempts = count * 20
+        while len(chosen) < count and attempts:
+            attempts -= 1
+            chosen.update(self.generator.choices(
+                self.population, cum_weights=self.cum_weights,
+                k=count - len(chosen)))
+            chosen.discard(exclude)
+        return chosen
+
+
+class Command(BaseCommand):
+    help = ("Генерация синтетических пользователей, рецептов, подписок, "
+            "избранного и корзин для профилирования")
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=1000)
+        parser.add_argument('--recipes', type=int, default=10000)
+        parser.add_argument('--follows', type=int, default=10,
+                            help='Среднее число подписок пользователя')
+        parser.add_argument('--favorites', type=int, default=20,
+                            help='Среднее число рецептов в избранном')
+        parser.add_argument('--cart', type=int, default=5,
+                            help='Среднее число рецептов в корзине')
+        parser.add_argument('--ingredients', type=int, default=8,
+                            help='Наибольшее число ингредиентов в рецепте')
+        parser.add_argument('--skew', type=float, default=1.1,
+                            help='Перекос популярности авторов и рецептов')
+        parser.add_argument('--seed', type=int, default=1)
+        parser.add_argument('--prefix', default='seed',
+                            help='Префикс имён создаваемых пользователей')
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        self.generator = random.Random(options['seed'])
+        self.options = options
+        ingredient_ids = list(
+            Ingredient.objects.order_by('pk').values_list('pk', flat=True))
+        if not ingredient_ids:
+            raise CommandError(
+                "Нет ингредиентов, сначала выполните load_ingredients")
+        if User.objects.filter(
+                username__startswith=options['prefix']).exists():
+            raise CommandError(
+                f"Пользователи с префиксом {options['prefix']} уже есть, "
+                f"укажите другой --prefix")
+        start = time.perf_counter()
+        with transaction.atomic():
+            if not Tag.objects.exists():
+                Tag.objects.bulk_create(
+                    Tag(name=name, color=color, slug=slug)
+                    for name, color, slug in DEFAULT_TAGS)
+            user_ids = self.create_users()
+            recipe_ids = self.create_recipes(user_ids, ingredient_ids)
+            self.create_relations(user_ids, recipe_ids)
+            self.rebuild_derived()
+        cache.clear()
+        self.stdout.write(
+            f"Данные созданы за {time.perf_counter() - start:.1f} с")
+
+    def step(self, name, model, rows):
+        start = time.perf_counter()
+        count = insert(model, rows, self.options['batch_size'])
+        self.stdout.write(
+            f"{name}: {count} строк за "
+            f"{time.perf_counter() - start:.1f} с")
+
+    def per_user(self, average):
+        return self.generator.randint(0, 2 * average)
+
+    def create_users(self):
+        prefix = self.options['prefix']
+        password = make_password(prefix)
+        self.step('Пользователи', User, (
+            {
+                'email': f'{prefix}{number}@foodgram.local',
+                'username': f'{prefix}{number}',
+                'first_name': f'Имя{number}',
+                'last_name': f'Фамилия{number}',
+                'password': password,
+            }
+            for number in range(self.options['users'])
+        ))
+        return list(User.objects.filter(username__startswith=prefix)
+                    .order_by('pk').values_list('pk', flat=True))
+
+    def create_recipes(self, user_ids, ingredient_ids):
+        generator, options = self.generator, self.options
+        authors = Sampler(generator, user_ids, options['skew'])
+        self.step('Рецепты', Recipe, (
+            {
+                'author_id': authors.one(),
+                'name': ' '.join(generator.choices(WORDS, k=3)).capitalize(),
+                'text': ' '.join(generator.choices(WORDS, k=30)),
+                'cooking_time': generator.randint(1, 180),
+                'image_status': Recipe.ImageStatus.READY.value,
+            }
+            for _ in range(options['recipes'])
+        ))
+        recipe_ids = list(Recipe.objects.filter(author_id__in=user_ids)
+                          .order_by('pk').values_list('pk', flat=True))
+        tag_ids = list(Tag.objects.values_list('pk', flat=True))
+        tags = Recipe.tags.through
+        self.step('Теги рецептов', tags, (
+            {'recipe_id': recipe_id, 'tag_id': tag_id}
+            for recipe_id in recipe_ids
+            for tag_id in generator.sample(
+                tag_ids, generator.randint(1, min(3, len(tag_ids))))
+        ))
+        ingredients = Sampler(generator, ingredient_ids, options['skew'])
+        self.step('Ингредиенты рецептов', IngredientInRecipe, (
+            {
+                'recipe_id': recipe_id,
+                'ingredient_id': ingredient_id,
+                'amount': generator.randint(1, 500),
+            }
+            for recipe_id in recipe_ids
+            for ingredient_id in ingredients.distinct(
+                generator.randint(1, options['ingredients']))
+        ))
+        return recipe_ids
+
+    def create_relations(self, user_ids, recipe_ids):
+        generator, options = self.generator, self.options
+        authors = Sampler(generator, user_ids, options['skew'])
+        popular = list(recipe_ids)
+        generator.shuffle(popular)
+        recipes = Sampler(generator, popular, options['skew'])
+        self.step('Подписки', Follow, (
+            {'user_id': user_id, 'author_id': author_id}
+            for user_id in user_ids
+            for author_id in authors.distinct(
+                self.per_user(options['follows']), exclude=user_id)
+        ))
+        for name, model, average in (
+                ('Избранное', Favorite, options['favorites']),
+                ('Корзины', ShoppingCart, options['cart'])):
+            self.step(name, model, (
+                {'user_id': user_id, 'recipe_id': recipe_id}
+                for user_id in user_ids
+                for recipe_id in recipes.distinct(self.per_user(average))
+            ))
+
+    def rebuild_derived(self):
+        '''Данные, которые обычно поддерживают сигналы.'''
+        start = time.perf_counter()
+        rebuild_index()
+        for model, target, field, counter in COUNTERS:
+            reconcile_counter(target, counter, model, field)
+        ShoppingListItem.objects.rebuild()
+        for model in (Tag, Ingredient, User):
+            TableVersion.objects.bump(model._meta.label_lower)
+        self.stdout.write(
+            f"Индекс, счётчики и списки покупок пересобраны за "
+            f"{time.perf_counter() - start:.1f} с")
@@ -0,0 +1,40 @@
+from django.db import migrations
+
+from recipes.search import POSTGRES_SEARCH_VECTOR, SQLITE_FTS_TABLE
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE recipes_recipe ADD COLUMN search_vector tsvector '
+            f'GENERATED ALWAYS AS ({POSTGRES_SEARCH_VECTOR}) STORED')
+        schema_editor.execute(
+            'CREATE INDEX recipes_recipe_search_vector_idx '
+            'ON recipes_recipe USING gin (search_vector)')
+    elif vendor == 'sqlite':
+        schema_editor.execute(
+            f'CREATE VIRTUAL TABLE {SQLITE_FTS_TABLE} USING fts5(name, text)')
+        schema_editor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, name, text) '
+            'SELECT id, name, text FROM recipes_recipe')
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            'ALTER TABLE recipes_recipe DROP COLUMN search_vector')
+    elif vendor == 'sqlite':
+        schema_editor.execute(f'DROP TABLE {SQLITE_FTS_TABLE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('recipes', '0006_counters'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -1,6 +1,11 @@
 from django.core.validators import MinValueValidator
-from django.db import models
+from django.db import connection, models
+from django.db.models import Case, F, Prefetch, Sum, Value, When, Window
+from django.db.models.functions import Greatest, RowNumber
+from django.utils import timezone
 
+from recipes.counters import ProtectedFieldsMixin
+from recipes.search import search_recipes
 from users.models import User
 
 
@@ -52,9 +57,57 @@ class Ingredient(models.Model):
         return f'{self.name}, {self.measurement_unit}'
 
 
-class Recipe(models.Model):
+class RecipeQuerySet(models.QuerySet):
+    """Выборки рецептов."""
+
+    def for_read(self):
+        """Рецепты со связанными объектами.
+
+        Количество запросов не зависит от числа рецептов в выборке.
+        """
+        return self.select_related('author').prefetch_related(
+            'tags',
+            Prefetch('recipe_ingredients',
+                     queryset=IngredientInRecipe.objects.select_related(
+                         'ingredient')),
+        )
+
+    def search(self, value):
+        """Полнотекстовый поиск по названию и описанию рецепта."""
+        return search_recipes(self, value)
+
+    def latest_for_authors(self, authors, limit=None):
+        """Последние рецепты каждого из авторов одним запросом.
+
+        Лимит применяется к каждому автору отдельно через ROW_NUMBER.
+        """
+        queryset = self.filter(author__in=authors)
+        if limit is None:
+            return queryset
+        queryset = queryset.order_by().annotate(recipe_rank=Window(
+            expression=RowNumber(),
+            partition_by=[F('author')],
+            order_by=F('pub_date').desc(),
+        ))
+        sql, params = queryset.query.sql_with_params()
+        return self.raw(
+            f'SELECT * FROM ({sql}) AS ranked '
+            f'WHERE recipe_rank <= %s ORDER BY recipe_rank',
+            (*params, limit),
+        )
+
+
+class Recipe(ProtectedFieldsMixin, models.Model):
     """Модель рецептов."""
 
+    protected_fields = ('favorites_count', 'in_carts_count', 'image_status',
+                        'image_thumbnail', 'image_webp')
+
+    class ImageStatus(models.TextChoices):
+        PENDING = 'pending', 'Ожидает обработки'
+        READY = 'ready', 'Обработано'
+        FAILED = 'failed', 'Ошибка обработки'
+
     author = models.ForeignKey(
         User,
         related_name='recipes',
@@ -71,6 +124,32 @@ class Recipe(models.Model):
         upload_to='recipes/',
         blank=True,
     )
+    image_thumbnail = models.ImageField(
+        verbose_name='Миниатюра',
+        upload_to='recipes/thumbnails/',
+        blank=True,
+    )
+    image_webp = models.ImageField(
+        verbose_name='Изображение WebP',
+        upload_to='recipes/webp/',
+        blank=True,
+    )
+    image_status = models.CharField(
+        verbose_name='Статус обработки изображения',
+        max_length=10,
+        choices=ImageStatus.choices,
+        default=ImageStatus.PENDING,
+        db_index=True,
+    )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name='В избранном',
+        default=0,
+        db_index=True,
+    )
+    in_carts_count = models.PositiveIntegerField(
+        verbose_name='В списках покупок',
+        default=0,
+    )
     text = models.TextField(
         verbose_name='Описание рецепта',
     )
@@ -93,6 +172,12 @@ class Recipe(models.Model):
         verbose_name='Дата публикации',
         auto_now_add=True
     )
+    updated_at = models.DateTimeField(
+        verbose_name='Дата изменения',
+        auto_now=True
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ('-pub_date',)
@@ -195,3 +280,214 @@ class ShoppingCart(models.Model):
 
     def __str__(self):
         return f'{self.user} добавил в список {self.recipe}'
+
+
+class ShoppingListQuerySet(models.QuerySet):
+    """Операции над суммарными списками покупок."""
+
+    def change_amounts(self, user_ids, amounts):
+        """Прибавляет количества ингредиентов к спискам пользователей.
+
+        amounts - словарь {ingredient_id: изменение количества}.
+        Прибавка выполняется одним INSERT ... ON CONFLICT DO UPDATE,
+        поэтому параллельные добавления не приводят к IntegrityError.
+        Уменьшение - одним UPDATE. Строки с нулевым итогом удаляются.
+        """
+        user_ids = set(user_ids)
+        added = {key: value for key, value in amounts.items() if value > 0}
+        removed = {key: value for key, value in amounts.items() if value < 0}
+        if not user_ids or not (added or removed):
+            return
+        if added:
+            self.add_amounts(user_ids, added)
+        if removed:
+            self.filter(
+                user_id__in=user_ids, ingredient_id__in=removed
+            ).update(total_amount=Greatest(F('total_amount') + Case(
+                *(When(ingredient_id=key, then=Value(value))
+                  for key, value in removed.items()),
+                output_field=models.IntegerField(),
+            ), 0))
+            self.filter(user_id__in=user_ids, ingredient_id__in=removed,
+                        total_amount=0).delete()
+
+    def add_amounts(self, user_ids, amounts):
+        """Вставка или прибавка количеств одним запросом."""
+        rows = [(user_id, ingredient_id, amount)
+                for user_id in user_ids
+                for ingredient_id, amount in amounts.items()]
+        quote = connection.ops.quote_name
+        table = quote(self.model._meta.db_table)
+        user, ingredient, total = (
+            quote(self.model._meta.get_field(name).column)
+            for name in ('user', 'ingredient', 'total_amount'))
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT INTO {table} ({user}, {ingredient}, {total}) '
+                f'VALUES {", ".join(["(%s, %s, %s)"] * len(rows))} '
+                f'ON CONFLICT ({user}, {ingredient}) DO UPDATE '
+                f'SET {total} = {table}.{total} + EXCLUDED.{total}',
+                [value for row in rows for value in row])
+
+    def add_recipe(self, user_ids, recipe):
+        """Добавляет ингредиенты рецепта в списки пользователей."""
+        self.change_amounts(user_ids, recipe_amounts(recipe))
+
+    def remove_recipe(self, user_ids, recipe):
+        """Убирает ингредиенты рецепта из списков пользователей."""
+        self.change_amounts(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in recipe_amounts(recipe).items()
+        })
+
+    def add_recipes(self, user_ids, recipe_ids):
+        """Добавляет ингредиенты нескольких рецептов в списки."""
+        self.change_amounts(user_ids, recipes_amounts(recipe_ids))
+
+    def remove_recipes(self, user_ids, recipe_ids):
+        """Убирает ингредиенты нескольких рецептов из списков."""
+        self.change_amounts(user_ids, {
+            ingredient_id: -amount
+            for ingredient_id, amount in recipes_amounts(recipe_ids).items()
+        })
+
+    def live(self):
+        """Суммы ингредиентов, посчитанные по корзинам."""
+        return (
+            ShoppingCart.objects
+            .filter(recipe__recipe_ingredients__isnull=False)
+            .values('user', ingredient=F('recipe__recipe_ingredients'
+                                         '__ingredient'))
+            .annotate(total_amount=Sum('recipe__recipe_ingredients__amount'))
+            .order_by()
+        )
+
+    def rebuild(self):
+        """Пересоздаёт все списки по текущим корзинам."""
+        self.all().delete()
+        return len(self.bulk_create(
+            self.model(
+                user_id=row['user'],
+                ingredient_id=row['ingredient'],
+                total_amount=row['total_amount'],
+            )
+            for row in self.live().iterator()
+        ))
+
+
+def recipe_amounts(recipe):
+    """Количества ингредиентов рецепта в виде {ingredient_id: amount}."""
+    return dict(
+        recipe.recipe_ingredients.values_list('ingredient_id', 'amount'))
+
+
+def recipes_amounts(recipe_ids):
+    """Суммарные количества ингредиентов нескольких рецептов."""
+    if not recipe_ids:
+        return {}
+    return dict(
+        IngredientInRecipe.objects
+        .filter(recipe_id__in=recipe_ids)
+        .order_by()
+        .values('ingredient_id')
+        .annotate(total=Sum('amount'))
+        .values_list('ingredient_id', 'total'))
+
+
+def delete_recipe_ingredients(pks):
+    """Удаляет строки ингредиентов рецептов одним DELETE в обход сигналов.
+
+    Списки покупок при этом пересчитывает вызывающий код.
+    """
+    if not pks:
+        return
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {quote(IngredientInRecipe._meta.db_table)} '
+            f'WHERE {quote(IngredientInRecipe._meta.pk.column)} '
+            f'IN ({", ".join(["%s"] * len(pks))})',
+            list(pks))
+
+
+class ShoppingListItem(models.Model):
+    """Суммарное количество ингредиента в списке покупок пользователя."""
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='shopping_list',
+        verbose_name='Пользователь',
+    )
+    ingredient = models.ForeignKey(
+        Ingredient,
+        on_delete=models.CASCADE,
+        related_name='shopping_list_items',
+        verbose_name='Ингредиент',
+    )
+    total_amount = models.PositiveIntegerField(
+        verbose_name='Общее количество',
+    )
+
+    objects = ShoppingListQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Ингредиент в списке покупок'
+        verbose_name_plural = 'Ингредиенты в списках покупок'
+        constraints = (
+            models.UniqueConstraint(
+                name='Ингредиент в списке покупок должен быть уникальным',
+                fields=('user', 'ingredient'),
+            ),
+        )
+
+    def __str__(self):
+        return f'{self.ingredient} - {self.total_amount}'
+
+
+class TableVersionQuerySet(models.QuerySet):
+    """Операции над версиями таблиц."""
+
+    def bump(self, table):
+        """Увеличивает версию таблицы."""
+        version, created = self.get_or_create(
+            table=table, defaults={'version': 1})
+        if not created:
+            self.filter(pk=version.pk).update(
+                version=F('version') + 1, updated_at=timezone.now())
+
+    def current(self, *tables):
+        """Словарь {таблица: (версия, дата изменения)}."""
+        return {
+            table: (version, updated_at)
+            for table, version, updated_at in self.filter(
+                table__in=tables).values_list(
+                    'table', 'version', 'updated_at')
+        }
+
+
+class TableVersion(models.Model):
+    """Версия данных таблицы для условных GET-запросов."""
+
+    table = models.CharField(
+        max_length=100,
+        unique=True,
+        verbose_name='Таблица',
+    )
+    version = models.PositiveBigIntegerField(
+        default=0,
+        verbose_name='Версия',
+    )
+    updated_at = models.DateTimeField(
+        default=timezone.now,
+        verbose_name='Дата изменения',
+    )
+
+    objects = TableVersionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = 'Версия таблицы'
+        verbose_name_plural = 'Версии таблиц'
+
+    def __str__(self):
+        return f'{self.table}: {self.version}'
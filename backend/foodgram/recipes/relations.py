@@ -0,0 +1,144 @@
+import time
+
+from django.core.cache import cache
+from django.db import connection, transaction
+
+from foodgram.settings import RELATION_CACHE_TIMEOUT
+from recipes.counters import change_counters
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+RELATIONS = {
+    'favorites': (Favorite, 'recipe_id'),
+    'shopping_cart': (ShoppingCart, 'recipe_id'),
+    'following': (Follow, 'author_id'),
+}
+
+RELATION_COUNTERS = {
+    'favorites': 'favorites_count',
+    'shopping_cart': 'in_carts_count',
+    'following': 'followers_count',
+}
+
+
+def generation_key(relation, user_id):
+    return f'relations:{relation}:{user_id}:generation'
+
+
+def cache_key(relation, user_id):
+    """Ключ множества связей в текущем поколении связей пользователя.
+
+    Поколение читается до запроса к базе, поэтому множество, загруженное
+    до параллельного изменения связей, сохраняется под ключом уже
+    устаревшего поколения и никогда не читается.
+    """
+    key = generation_key(relation, user_id)
+    generation = cache.get(key)
+    if generation is None:
+        cache.add(key, time.time_ns(), None)
+        generation = cache.get(key)
+    return f'relations:{relation}:{user_id}:{generation}'
+
+
+def relation_ids(request, relation):
+    """Множество id объектов, связанных с пользователем запроса.
+
+    favorites и shopping_cart - id рецептов, following - id авторов.
+    Множество загружается один раз за запрос и хранится в кэше Django
+    до изменения связей пользователя.
+    """
+    user = getattr(request, 'user', None)
+    if user is None or not user.is_authenticated:
+        return frozenset()
+    loaded = request.__dict__.setdefault('_relation_ids', {})
+    if relation not in loaded:
+        key = cache_key(relation, user.pk)
+        ids = cache.get(key)
+        if ids is None:
+            model, field = RELATIONS[relation]
+            ids = frozenset(model.objects.filter(
+                user=user).values_list(field, flat=True))
+            cache.set(key, ids, RELATION_CACHE_TIMEOUT)
+        loaded[relation] = ids
+    return loaded[relation]
+
+
+def bump_generation(relation, user_id):
+    key = generation_key(relation, user_id)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
+
+
+def invalidate_relation(relation, user_id):
+    """Начинает новое поколение связей после фиксации транзакции."""
+    transaction.on_commit(lambda: bump_generation(relation, user_id))
+
+
+def relation_sql(relation, target_ids):
+    """Имена таблиц и столбцов связи и подготовленные id объектов."""
+    model, field = RELATIONS[relation]
+    quote = connection.ops.quote_name
+    target_field = model._meta.get_field(field)
+    target = target_field.related_model
+    ids = [target._meta.pk.get_prep_value(pk) for pk in target_ids]
+    return target, ids, {
+        'table': quote(model._meta.db_table),
+        'user': quote(model._meta.get_field('user').column),
+        'column': quote(target_field.column),
+        'target_table': quote(target._meta.db_table),
+        'target_pk': quote(target._meta.pk.column),
+        'ids': ', '.join(['%s'] * len(ids)),
+    }
+
+
+def change_relations(relation, user_id, target, ids, delta):
+    """Счётчики и кэш после изменения связей в обход сигналов."""
+    if not ids:
+        return
+    change_counters(target, ids, RELATION_COUNTERS[relation], delta)
+    invalidate_relation(relation, user_id)
+
+
+@transaction.atomic(savepoint=False)
+def add_relations(relation, user_id, target_ids):
+    """Создаёт связи пользователя с объектами одним INSERT.
+
+    Уже существующие связи и несуществующие объекты пропускаются без
+    ошибок (ON CONFLICT DO NOTHING), поэтому повторные и параллельные
+    запросы не приводят к IntegrityError. Возвращает список id
+    объектов, для которых связь создана.
+    """
+    target, ids, names = relation_sql(relation, target_ids)
+    if not ids:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'INSERT INTO {table} ({user}, {column}) '
+            'SELECT %s, {target_pk} FROM {target_table} '
+            'WHERE {target_pk} IN ({ids}) '
+            'ON CONFLICT DO NOTHING RETURNING {column}'.format(**names),
+            [user_id, *ids])
+        created = [row[0] for row in cursor.fetchall()]
+    change_relations(relation, user_id, target, created, 1)
+    return created
+
+
+@transaction.atomic(savepoint=False)
+def remove_relations(relation, user_id, target_ids):
+    """Удаляет связи пользователя с объектами одним DELETE.
+
+    Возвращает список id объектов, связь с которыми была удалена.
+    """
+    target, ids, names = relation_sql(relation, target_ids)
+    if not ids:
+        return []
+    with connection.cursor() as cursor:
+        cursor.execute(
+            'DELETE FROM {table} WHERE {user} = %s AND {column} IN ({ids}) '
+            'RETURNING {column}'.format(**names),
+            [user_id, *ids])
+        removed = [row[0] for row in cursor.fetchall()]
+    change_relations(relation, user_id, target, removed, -1)
+    return removed
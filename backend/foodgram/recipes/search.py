@@ -0,0 +1,96 @@
+from django.db import connections
+from django.db.models import BooleanField, Case, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+SEARCH_CONFIG = 'russian'
+
+SQLITE_FTS_TABLE = 'recipes_recipe_fts'
+
+RANK_ORDERING = ('-search_rank', '-pub_date', '-id')
+
+POSTGRES_SEARCH_VECTOR = (
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(name, '')), 'A') || "
+    f"setweight(to_tsvector('{SEARCH_CONFIG}', coalesce(text, '')), 'B')"
+)
+
+
+def fts_query(value):
+    """Запрос FTS5: все слова строки, экранированные как фразы."""
+    return ' '.join(
+        '"{}"'.format(word.replace('"', '""')) for word in value.split())
+
+
+def search_recipes(queryset, value):
+    """Рецепты, подходящие под поисковую строку, по убыванию релевантности.
+
+    На PostgreSQL используется столбец search_vector с GIN-индексом,
+    на SQLite - таблица FTS5. На остальных СУБД строка ищется через
+    icontains в названии и описании, совпадения в названии идут первыми.
+    """
+    table = queryset.model._meta.db_table
+    vendor = connections[queryset.db].vendor
+    if vendor == 'postgresql':
+        query = f"websearch_to_tsquery('{SEARCH_CONFIG}', %s)"
+        return queryset.filter(RawSQL(
+            f'"{table}"."search_vector" @@ {query}', (value,),
+            output_field=BooleanField(),
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank("{table}"."search_vector", {query})', (value,),
+            output_field=FloatField(),
+        )).order_by(*RANK_ORDERING)
+    if vendor == 'sqlite':
+        query = fts_query(value)
+        if not query:
+            return queryset.none()
+        return queryset.extra(
+            tables=[SQLITE_FTS_TABLE],
+            where=[f'{SQLITE_FTS_TABLE}.rowid = "{table}"."id"',
+                   f'{SQLITE_FTS_TABLE} MATCH %s'],
+            params=[query],
+            select={'search_rank': f'-bm25({SQLITE_FTS_TABLE}, 10.0, 1.0)'},
+        ).order_by(*RANK_ORDERING)
+    return queryset.filter(
+        Q(name__icontains=value) | Q(text__icontains=value),
+    ).annotate(search_rank=Case(
+        When(name__icontains=value, then=Value(1.0)),
+        default=Value(0.0),
+        output_field=FloatField(),
+    )).order_by(*RANK_ORDERING)
+
+
+def index_recipe(recipe, using='default'):
+    """Обновляет запись рецепта в индексе FTS5 (только SQLite)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', (recipe.pk,))
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, name, text) '
+            f'VALUES (%s, %s, %s)', (recipe.pk, recipe.name, recipe.text))
+
+
+def unindex_recipe(recipe, using='default'):
+    """Удаляет рецепт из индекса FTS5 (только SQLite)."""
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f'DELETE FROM {SQLITE_FTS_TABLE} WHERE rowid = %s', (recipe.pk,))
+
+
+def rebuild_index(using='default'):
+    """Перестраивает индекс FTS5 по всем рецептам (только SQLite).
+
+    Нужен после bulk_create, который не отправляет сигналы.
+    """
+    connection = connections[using]
+    if connection.vendor != 'sqlite':
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {SQLITE_FTS_TABLE}')
+        cursor.execute(
+            f'INSERT INTO {SQLITE_FTS_TABLE} (rowid, name, text) '
+            f'SELECT id, name, text FROM recipes_recipe')
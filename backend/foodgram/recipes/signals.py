@@ -0,0 +1,154 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.utils import timezone
+
+from recipes.counters import change_counter
+from recipes.models import (Favorite, Ingredient, IngredientInRecipe, Recipe,
+                            ShoppingCart, ShoppingListItem, TableVersion, Tag,
+                            recipe_amounts)
+from recipes.relations import RELATIONS, invalidate_relation
+from recipes.search import index_recipe, unindex_recipe
+from users.models import Follow, User
+
+COUNTERS = (
+    (Favorite, Recipe, 'recipe', 'favorites_count'),
+    (ShoppingCart, Recipe, 'recipe', 'in_carts_count'),
+    (Recipe, User, 'author', 'recipes_count'),
+    (Follow, User, 'author', 'followers_count'),
+)
+
+
+def bump_table_version(sender, update_fields=None, **kwargs):
+    # Вход пользователя меняет только last_login, данные в ответах прежние.
+    if update_fields is not None and set(update_fields) == {'last_login'}:
+        return
+    TableVersion.objects.bump(sender._meta.label_lower)
+
+
+for model in (Tag, Ingredient, User):
+    for signal in (post_save, post_delete):
+        signal.connect(bump_table_version, sender=model,
+                       dispatch_uid=f'bump_{model._meta.label_lower}')
+
+
+def counter_receivers(target, field, counter):
+    attname = f'{field}_id'
+
+    def increment(instance, created, **kwargs):
+        if created:
+            change_counter(target, getattr(instance, attname), counter, 1)
+
+    def decrement(instance, **kwargs):
+        change_counter(target, getattr(instance, attname), counter, -1)
+
+    return increment, decrement
+
+
+for model, target, field, counter in COUNTERS:
+    increment, decrement = counter_receivers(target, field, counter)
+    post_save.connect(increment, sender=model, weak=False,
+                      dispatch_uid=f'increment_{counter}')
+    post_delete.connect(decrement, sender=model, weak=False,
+                        dispatch_uid=f'decrement_{counter}')
+
+
+def cart_amounts(cart):
+    return [cart.user_id], recipe_amounts(Recipe(pk=cart.recipe_id))
+
+
+def recipe_ingredient_amounts(item):
+    return (
+        ShoppingCart.objects.filter(
+            recipe_id=item.recipe_id).values_list('user_id', flat=True),
+        {item.ingredient_id: item.amount},
+    )
+
+
+# Модели, изменения которых меняют суммарные списки покупок: функция
+# возвращает пользователей и количества, которые строка добавляет в списки.
+# Массовые операции API идут в обход сигналов и пересчитывают списки сами.
+SHOPPING_LISTS = (
+    (ShoppingCart, ('user_id', 'recipe_id'), cart_amounts),
+    (IngredientInRecipe, ('recipe_id', 'ingredient_id', 'amount'),
+     recipe_ingredient_amounts),
+)
+
+
+def shopping_list_receivers(model, fields, amounts):
+    def change(instance, sign):
+        user_ids, changes = amounts(instance)
+        ShoppingListItem.objects.change_amounts(user_ids, {
+            ingredient_id: sign * amount
+            for ingredient_id, amount in changes.items()
+        })
+
+    def remember(instance, **kwargs):
+        if not instance._state.adding:
+            instance._shopping_list_previous = model.objects.filter(
+                pk=instance.pk).first()
+
+    def save(instance, **kwargs):
+        previous = instance.__dict__.pop('_shopping_list_previous', None)
+        if previous is not None:
+            if all(getattr(previous, field) == getattr(instance, field)
+                   for field in fields):
+                return
+            change(previous, -1)
+        change(instance, 1)
+
+    def delete(instance, **kwargs):
+        change(instance, -1)
+
+    return remember, save, delete
+
+
+for model, fields, amounts in SHOPPING_LISTS:
+    remember, save, delete = shopping_list_receivers(model, fields, amounts)
+    name = model._meta.label_lower
+    pre_save.connect(remember, sender=model, weak=False,
+                     dispatch_uid=f'shopping_list_remember_{name}')
+    post_save.connect(save, sender=model, weak=False,
+                      dispatch_uid=f'shopping_list_save_{name}')
+    post_delete.connect(delete, sender=model, weak=False,
+                        dispatch_uid=f'shopping_list_delete_{name}')
+
+
+def touch_recipe(instance, **kwargs):
+    # Строки ингредиентов меняются и в обход рецепта (например, в админке),
+    # а от даты изменения рецепта зависят ETag и Last-Modified.
+    Recipe.objects.filter(pk=instance.recipe_id).update(
+        updated_at=timezone.now())
+
+
+post_save.connect(touch_recipe, sender=IngredientInRecipe,
+                  dispatch_uid='touch_recipe_save')
+post_delete.connect(touch_recipe, sender=IngredientInRecipe,
+                    dispatch_uid='touch_recipe_delete')
+
+
+def update_search_index(instance, using, **kwargs):
+    index_recipe(instance, using)
+
+
+def remove_from_search_index(instance, using, **kwargs):
+    unindex_recipe(instance, using)
+
+
+post_save.connect(update_search_index, sender=Recipe,
+                  dispatch_uid='update_search_index')
+post_delete.connect(remove_from_search_index, sender=Recipe,
+                    dispatch_uid='remove_from_search_index')
+
+
+def relation_receiver(relation):
+    def invalidate(instance, **kwargs):
+        invalidate_relation(relation, instance.user_id)
+
+    return invalidate
+
+
+for relation, (model, field) in RELATIONS.items():
+    receiver = relation_receiver(relation)
+    post_save.connect(receiver, sender=model, weak=False,
+                      dispatch_uid=f'invalidate_{relation}_save')
+    post_delete.connect(receiver, sender=model, weak=False,
+                        dispatch_uid=f'invalidate_{relation}_delete')
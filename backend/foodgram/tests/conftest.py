@@ -0,0 +1,106 @@
+import pytest
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.test import APIClient
+
+from recipes.models import Ingredient, IngredientInRecipe, Recipe, Tag
+from users.models import User
+
+
+@pytest.fixture(scope='session')
+def django_db_modify_db_settings(django_db_modify_db_settings_parallel_suffix,
+                                 tmp_path_factory):
+    # Тестовая база SQLite в памяти блокирует таблицы целиком, поэтому
+    # для тестов с потоками она хранится в файле.
+    database = settings.DATABASES['default']
+    if database['ENGINE'] == 'django.db.backends.sqlite3':
+        database.setdefault('TEST', {})['NAME'] = str(
+            tmp_path_factory.mktemp('db') / 'test.sqlite3')
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def media_root(settings, tmp_path):
+    settings.MEDIA_ROOT = str(tmp_path / 'media')
+
+
+def create_user(number):
+    return User.objects.create_user(
+        email=f'user{number}@foodgram.local',
+        username=f'user{number}',
+        first_name='Имя',
+        last_name='Фамилия',
+        password='Pa55-word-for-tests',
+    )
+
+
+@pytest.fixture
+def user(db):
+    return create_user(1)
+
+
+@pytest.fixture
+def another_user(db):
+    return create_user(2)
+
+
+@pytest.fixture
+def anonymous_client():
+    return APIClient()
+
+
+@pytest.fixture
+def user_client(user):
+    client = APIClient()
+    client.force_authenticate(user)
+    return client
+
+
+@pytest.fixture
+def tags(db):
+    return [
+        Tag.objects.create(name=name, color=color, slug=slug)
+        for name, color, slug in (
+            ('Завтрак', '#E26C2D', 'breakfast'),
+            ('Обед', '#49B64E', 'lunch'),
+            ('Ужин', '#8775D2', 'dinner'),
+        )
+    ]
+
+
+@pytest.fixture
+def ingredients(db):
+    Ingredient.objects.bulk_create(
+        Ingredient(name=f'Ингредиент {number}', measurement_unit='г')
+        for number in range(30))
+    return list(Ingredient.objects.all())
+
+
+@pytest.fixture
+def make_recipe(tags, ingredients):
+    def make_recipe(author, number=0, size=3):
+        recipe = Recipe.objects.create(
+            author=author,
+            name=f'Рецепт {number}',
+            text=f'Описание {number}',
+            cooking_time=10,
+            image_status=Recipe.ImageStatus.READY,
+        )
+        recipe.tags.set(tags[:1 + number % len(tags)])
+        IngredientInRecipe.objects.bulk_create(
+            IngredientInRecipe(
+                recipe=recipe,
+                ingredient=ingredients[(number + offset) % len(ingredients)],
+                amount=offset + 1,
+            )
+            for offset in range(size)
+        )
+        return recipe
+
+    return make_recipe
@@ -0,0 +1,29 @@
+import pytest
+from rest_framework.authtoken.models import Token
+
+from api.authentication import TokenCache
+
+pytestmark = pytest.mark.django_db
+
+
+def test_revocation_reaches_other_processes(user):
+    # Два экземпляра кэша - как в двух воркерах gunicorn.
+    first, second = (TokenCache(size=10, ttl=60, shared=True)
+                     for _ in range(2))
+    first.set('key', user)
+    assert second.get('key') == user
+
+    second.invalidate('key')
+
+    assert first.get('key') is None
+
+
+def test_logout_revokes_token(anonymous_client, user):
+    token = Token.objects.create(user=user)
+    anonymous_client.credentials(HTTP_AUTHORIZATION=f'Token {token.key}')
+    assert anonymous_client.get('/api/users/me/').status_code == 200
+
+    response = anonymous_client.post('/api/auth/token/logout/')
+    assert response.status_code == 204
+
+    assert anonymous_client.get('/api/users/me/').status_code == 401
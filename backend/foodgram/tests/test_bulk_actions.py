@@ -0,0 +1,123 @@
+import pytest
+from django.core.management import call_command
+
+from foodgram.settings import BULK_ACTION_LIMIT
+from recipes.models import Recipe, ShoppingListItem
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+MISSING = 999999
+
+
+@pytest.fixture
+def recipes(another_user, make_recipe):
+    return [make_recipe(another_user, number) for number in range(3)]
+
+
+def statuses(response):
+    assert response.status_code == 200
+    return [(result['id'], result['status'])
+            for result in response.json()['results']]
+
+
+def counters(field, objects):
+    model = type(objects[0])
+    return list(model.objects.filter(
+        pk__in=[instance.pk for instance in objects],
+    ).order_by('pk').values_list(field, flat=True))
+
+
+def test_favorite_bulk(user_client, recipes):
+    first, second, third = (recipe.pk for recipe in recipes)
+    url = '/api/recipes/favorite/'
+    user_client.post(f'/api/recipes/{first}/favorite/')
+
+    response = user_client.post(
+        url, {'ids': [second, first, MISSING, second]}, format='json')
+
+    assert statuses(response) == [
+        (second, 201), (first, 400), (MISSING, 404)]
+    assert counters('favorites_count', recipes) == [1, 1, 0]
+
+    response = user_client.delete(
+        url, {'ids': [third, first, second]}, format='json')
+
+    assert statuses(response) == [(third, 404), (first, 204), (second, 204)]
+    assert counters('favorites_count', recipes) == [0, 0, 0]
+
+
+def test_shopping_cart_bulk(user_client, user, recipes):
+    first, second, third = (recipe.pk for recipe in recipes)
+    url = '/api/recipes/shopping_cart/'
+
+    response = user_client.post(
+        url, {'ids': [first, second, MISSING]}, format='json')
+
+    assert statuses(response) == [(first, 201), (second, 201), (MISSING, 404)]
+    assert counters('in_carts_count', recipes) == [1, 1, 0]
+    assert ShoppingListItem.objects.filter(user=user).exists()
+    call_command('rebuild_shopping_lists', '--check')
+
+    response = user_client.post(url, {'ids': [second, third]}, format='json')
+
+    assert statuses(response) == [(second, 400), (third, 201)]
+    call_command('rebuild_shopping_lists', '--check')
+
+    response = user_client.delete(
+        url, {'ids': [first, second, third]}, format='json')
+
+    assert statuses(response) == [(first, 204), (second, 204), (third, 204)]
+    assert counters('in_carts_count', recipes) == [0, 0, 0]
+    assert not ShoppingListItem.objects.filter(user=user).exists()
+
+
+def test_subscribe_bulk(user_client, user, another_user):
+    url = '/api/users/subscribe/'
+    ids = [another_user.pk, user.pk, MISSING]
+
+    response = user_client.post(url, {'ids': ids}, format='json')
+
+    assert statuses(response) == [
+        (another_user.pk, 201), (user.pk, 400), (MISSING, 404)]
+    assert User.objects.get(pk=another_user.pk).followers_count == 1
+
+    response = user_client.post(url, {'ids': ids[:1]}, format='json')
+
+    assert statuses(response) == [(another_user.pk, 400)]
+
+    response = user_client.delete(url, {'ids': ids}, format='json')
+
+    assert statuses(response) == [
+        (another_user.pk, 204), (user.pk, 404), (MISSING, 404)]
+    assert User.objects.get(pk=another_user.pk).followers_count == 0
+
+
+@pytest.mark.parametrize('url', [
+    '/api/recipes/favorite/',
+    '/api/recipes/shopping_cart/',
+    '/api/users/subscribe/',
+])
+@pytest.mark.parametrize('method', ['post', 'delete'])
+@pytest.mark.parametrize('ids', [
+    [], list(range(1, BULK_ACTION_LIMIT + 2)), ['x'],
+])
+def test_bulk_rejects_invalid_ids(user_client, recipes, url, method, ids):
+    response = getattr(user_client, method)(url, {'ids': ids}, format='json')
+
+    assert response.status_code == 400
+    assert 'ids' in response.json()
+    assert counters('favorites_count', recipes) == [0, 0, 0]
+    assert counters('in_carts_count', recipes) == [0, 0, 0]
+    assert not Recipe.objects.filter(in_shopping_cart__isnull=False).exists()
+
+
+def test_bulk_accepts_limit(user_client, recipes):
+    ids = [recipe.pk for recipe in recipes] + [
+        MISSING - number for number in range(BULK_ACTION_LIMIT - 3)]
+
+    response = user_client.post(
+        '/api/recipes/favorite/', {'ids': ids}, format='json')
+
+    assert len(statuses(response)) == BULK_ACTION_LIMIT
+    assert counters('favorites_count', recipes) == [1, 1, 1]
@@ -0,0 +1,136 @@
+import threading
+
+import pytest
+from django.core.cache import caches
+from django.db import connections
+from rest_framework.test import APIClient
+
+from recipes.models import Favorite, ShoppingCart, ShoppingListItem
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db(transaction=True)
+
+THREADS = 8
+
+
+def hammer(user, method, urls):
+    '''Статусы одновременных запросов method по адресам urls.'''
+    barrier = threading.Barrier(len(urls))
+    statuses = []
+
+    def send(url):
+        client = APIClient(raise_request_exception=False)
+        client.force_authenticate(user)
+        barrier.wait()
+        try:
+            statuses.append(getattr(client, method)(url).status_code)
+        finally:
+            connections.close_all()
+
+    threads = [threading.Thread(target=send, args=(url,)) for url in urls]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return sorted(statuses)
+
+
+@pytest.fixture
+def recipe(another_user, make_recipe):
+    return make_recipe(another_user, size=5)
+
+
+@pytest.mark.parametrize('path, model, counter', [
+    ('favorite', Favorite, 'favorites_count'),
+    ('shopping_cart', ShoppingCart, 'in_carts_count'),
+])
+def test_concurrent_recipe_relation(user, recipe, path, model, counter):
+    url = f'/api/recipes/{recipe.pk}/{path}/'
+
+    statuses = hammer(user, 'post', [url] * THREADS)
+    assert statuses.count(201) == 1
+    assert set(statuses) <= {201, 400}
+    recipe.refresh_from_db()
+    assert getattr(recipe, counter) == 1
+    assert model.objects.filter(user=user, recipe=recipe).count() == 1
+
+    statuses = hammer(user, 'delete', [url] * THREADS)
+    assert statuses.count(204) == 1
+    assert set(statuses) <= {204, 404}
+    recipe.refresh_from_db()
+    assert getattr(recipe, counter) == 0
+    assert not model.objects.filter(user=user, recipe=recipe).exists()
+    assert not ShoppingListItem.objects.filter(user=user).exists()
+
+
+def test_concurrent_cart_shopping_list(user, recipe, make_recipe):
+    # Рецепты с общими ингредиентами добавляются в корзину одновременно.
+    recipes = [recipe] + [make_recipe(recipe.author, number, size=5)
+                          for number in range(1, THREADS)]
+    statuses = hammer(user, 'post', [
+        f'/api/recipes/{recipe.pk}/shopping_cart/' for recipe in recipes])
+
+    assert statuses == [201] * THREADS
+    expected = {}
+    for recipe in recipes:
+        for ingredient_id, amount in recipe.recipe_ingredients.values_list(
+                'ingredient_id', 'amount'):
+            expected[ingredient_id] = expected.get(ingredient_id, 0) + amount
+    assert dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient_id', 'total_amount')) == expected
+
+
+def test_concurrent_subscribe(user, another_user):
+    url = f'/api/users/{another_user.pk}/subscribe/'
+
+    statuses = hammer(user, 'post', [url] * THREADS)
+    assert statuses.count(201) == 1
+    assert set(statuses) <= {201, 400}
+    another_user.refresh_from_db()
+    assert another_user.followers_count == 1
+
+    statuses = hammer(user, 'delete', [url] * THREADS)
+    assert statuses.count(204) == 1
+    assert set(statuses) <= {204, 404}
+    another_user.refresh_from_db()
+    assert another_user.followers_count == 0
+    assert not Follow.objects.filter(user=user).exists()
+
+
+def test_relation_cache_ignores_stale_sets(user, recipe, monkeypatch):
+    # Чтение связей успело загрузить старое множество, затем параллельный
+    # запрос добавил рецепт в избранное, и только потом чтение сохранило
+    # множество в кэш.
+    backend = type(caches['default'])
+    original_set = backend.set
+    loaded, committed = threading.Event(), threading.Event()
+
+    def set_after_commit(cache, key, *args, **kwargs):
+        if (threading.current_thread() is reader
+                and key.startswith('relations:favorites:')
+                and not loaded.is_set()):
+            loaded.set()
+            committed.wait(10)
+        return original_set(cache, key, *args, **kwargs)
+
+    monkeypatch.setattr(backend, 'set', set_after_commit)
+    client = APIClient(raise_request_exception=False)
+    client.force_authenticate(user)
+    url = f'/api/recipes/{recipe.pk}/'
+    statuses = []
+
+    def read():
+        try:
+            statuses.append(client.get(url).status_code)
+        finally:
+            connections.close_all()
+
+    reader = threading.Thread(target=read)
+    reader.start()
+    assert loaded.wait(10)
+    assert client.post(f'{url}favorite/').status_code == 201
+    committed.set()
+    reader.join()
+
+    assert statuses == [200]
+    assert client.get(url).json()['is_favorited'] is True
@@ -0,0 +1,90 @@
+import base64
+import io
+
+import pytest
+from PIL import Image
+
+from api.views import RecipeViewSet
+from recipes.counters import change_counter
+from recipes.models import Recipe
+from users.models import User
+
+pytestmark = pytest.mark.django_db
+
+
+def image_data():
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), 'orange').save(buffer, 'PNG')
+    return ('data:image/png;base64,'
+            + base64.b64encode(buffer.getvalue()).decode())
+
+
+@pytest.fixture
+def recipe(user, make_recipe):
+    return make_recipe(user, size=2)
+
+
+@pytest.fixture
+def concurrent_changes(monkeypatch):
+    '''Изменения других запросов и process_images после get_object().'''
+    get_object = RecipeViewSet.get_object
+
+    def changed_get_object(view):
+        instance = get_object(view)
+        change_counter(Recipe, instance.pk, 'favorites_count', 1)
+        change_counter(Recipe, instance.pk, 'in_carts_count', 1)
+        Recipe.objects.filter(pk=instance.pk).update(
+            image_status=Recipe.ImageStatus.READY,
+            image_thumbnail='recipes/thumbnails/done.jpg')
+        return instance
+
+    monkeypatch.setattr(RecipeViewSet, 'get_object', changed_get_object)
+
+
+def body(recipe, **changes):
+    return {
+        'tags': list(recipe.tags.values_list('pk', flat=True)),
+        'ingredients': [
+            {'id': item.ingredient_id, 'amount': item.amount}
+            for item in recipe.recipe_ingredients.all()
+        ],
+        **changes,
+    }
+
+
+def test_update_keeps_concurrent_changes(user_client, recipe,
+                                         concurrent_changes):
+    response = user_client.patch(f'/api/recipes/{recipe.pk}/',
+                                 body(recipe, text='Новое описание'),
+                                 format='json')
+
+    assert response.status_code == 200
+    recipe.refresh_from_db()
+    assert recipe.text == 'Новое описание'
+    assert (recipe.favorites_count, recipe.in_carts_count) == (1, 1)
+    assert recipe.image_status == Recipe.ImageStatus.READY
+    assert recipe.image_thumbnail.name == 'recipes/thumbnails/done.jpg'
+
+
+def test_new_image_is_queued(user_client, recipe, concurrent_changes):
+    response = user_client.patch(f'/api/recipes/{recipe.pk}/',
+                                 body(recipe, image=image_data()),
+                                 format='json')
+
+    assert response.status_code == 200
+    recipe.refresh_from_db()
+    assert recipe.image_status == Recipe.ImageStatus.PENDING
+    assert recipe.favorites_count == 1
+
+
+def test_user_save_keeps_counters(user):
+    user = User.objects.get(pk=user.pk)
+    change_counter(User, user.pk, 'followers_count', 1)
+    change_counter(User, user.pk, 'recipes_count', 2)
+
+    user.set_password('New-pa55-word')
+    user.save()
+
+    user.refresh_from_db()
+    assert (user.followers_count, user.recipes_count) == (1, 2)
+    assert user.check_password('New-pa55-word')
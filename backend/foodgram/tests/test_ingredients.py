@@ -0,0 +1,40 @@
+import pytest
+
+from api.indexes import ingredient_index
+from recipes.models import Ingredient, TableVersion
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/ingredients/'
+
+
+@pytest.fixture(autouse=True)
+def reset_index():
+    # Откат транзакции теста возвращает и версию таблицы.
+    ingredient_index.invalidate()
+
+
+def search(client, name):
+    return [item['name']
+            for item in client.get(URL, {'name': name}).json()]
+
+
+def test_index_follows_changes_from_other_processes(anonymous_client,
+                                                    ingredients):
+    assert search(anonymous_client, 'ингредиент 1') != []
+    # Другой процесс меняет таблицу: сигналы здесь не срабатывают,
+    # остаётся только новая версия таблицы.
+    Ingredient.objects.filter(pk=ingredients[0].pk).update(name='zucchini')
+    TableVersion.objects.bump(Ingredient._meta.label_lower)
+
+    assert search(anonymous_client, 'zucchini') == ['zucchini']
+
+
+def test_index_is_not_rebuilt_without_changes(anonymous_client, ingredients,
+                                              django_assert_num_queries):
+    search(anonymous_client, 'ингредиент')
+    built = ingredient_index._items
+
+    with django_assert_num_queries(1):
+        search(anonymous_client, 'ингредиент')
+    assert ingredient_index._items is built
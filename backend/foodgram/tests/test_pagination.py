@@ -0,0 +1,61 @@
+import base64
+import json
+
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/'
+
+
+def encode(value):
+    return base64.urlsafe_b64encode(json.dumps(value).encode()).decode()
+
+
+@pytest.fixture
+def recipes(user, make_recipe):
+    return [make_recipe(user, number) for number in range(5)]
+
+
+def test_cursor_pages(anonymous_client, recipes):
+    response = anonymous_client.get(URL, {'cursor': '', 'limit': 3})
+    assert response.status_code == 200
+    first = response.json()
+    response = anonymous_client.get(first['next'])
+    assert response.status_code == 200
+    second = response.json()
+
+    ids = [recipe['id'] for recipe in first['results'] + second['results']]
+    assert ids == [recipe.pk for recipe in reversed(recipes)]
+    assert second['next'] is None
+
+
+@pytest.mark.parametrize('cursor', [
+    'not base64!',
+    encode(1),
+    encode(None),
+    encode({'pub_date': 1}),
+    encode([1]),
+    encode(['x', 1]),
+    encode(['2020-01-01T00:00:00+00:00', 'x']),
+    encode(['2020-01-01T00:00:00+00:00', None]),
+    encode([[1], {}]),
+])
+def test_invalid_cursor(anonymous_client, recipes, cursor):
+    response = anonymous_client.get(URL, {'cursor': cursor})
+
+    assert response.status_code == 404
+
+
+def test_cursor_with_search(anonymous_client, recipes):
+    response = anonymous_client.get(URL, {'cursor': '', 'search': 'Рецепт'})
+
+    assert response.status_code == 400
+    assert 'cursor' in response.json()
+
+
+def test_cursor_with_filter(anonymous_client, recipes, user):
+    response = anonymous_client.get(URL, {'cursor': '', 'author': user.pk})
+
+    assert response.status_code == 200
+    assert len(response.json()['results']) == len(recipes)
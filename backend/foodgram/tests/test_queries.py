@@ -0,0 +1,102 @@
+import pytest
+
+from foodgram.settings import BULK_ACTION_LIMIT
+from recipes.models import Favorite, ShoppingCart
+from users.models import Follow
+
+# COUNT, страница рецептов с авторами, теги, ингредиенты.
+RECIPE_LIST_QUERIES = 4
+# Плюс множества избранного, корзины и подписок пользователя.
+RECIPE_LIST_USER_QUERIES = RECIPE_LIST_QUERIES + 3
+# Без COUNT: рецепты с авторами, теги, ингредиенты.
+RECIPE_BATCH_QUERIES = RECIPE_LIST_QUERIES - 1
+RECIPE_BATCH_USER_QUERIES = RECIPE_BATCH_QUERIES + 3
+
+
+@pytest.fixture
+def recipes(user, another_user, make_recipe):
+    recipes = [make_recipe(another_user if number % 2 else user, number)
+               for number in range(60)]
+    Favorite.objects.create(user=user, recipe=recipes[-1])
+    ShoppingCart.objects.create(user=user, recipe=recipes[-3])
+    Follow.objects.create(user=user, author=another_user)
+    return recipes
+
+
+@pytest.mark.parametrize('limit', (6, 50))
+def test_recipe_list_queries_anonymous(
+        recipes, anonymous_client, django_assert_num_queries, limit):
+    with django_assert_num_queries(RECIPE_LIST_QUERIES):
+        response = anonymous_client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    assert len(response.json()['results']) == limit
+
+
+@pytest.mark.parametrize('limit', (6, 50))
+def test_recipe_list_queries_authenticated(
+        recipes, user_client, django_assert_num_queries, limit):
+    with django_assert_num_queries(RECIPE_LIST_USER_QUERIES):
+        response = user_client.get(f'/api/recipes/?limit={limit}')
+    assert response.status_code == 200
+    results = response.json()['results']
+    assert len(results) == limit
+    flags = {recipe['id']: recipe for recipe in results}
+    assert flags[recipes[-1].pk]['is_favorited']
+    assert flags[recipes[-3].pk]['is_in_shopping_cart']
+    assert flags[recipes[-1].pk]['author']['is_subscribed']
+    assert not flags[recipes[-2].pk]['is_favorited']
+
+
+def batch_url(ids):
+    return '/api/recipes/?ids=' + ','.join(map(str, ids))
+
+
+@pytest.mark.parametrize('size', (5, 50))
+def test_recipe_batch_keeps_order(recipes, anonymous_client,
+                                  django_assert_num_queries, size):
+    ids = [recipe.pk for recipe in reversed(recipes[:size])]
+    requested = ids[:2] + [999999] + ids[2:]
+
+    with django_assert_num_queries(RECIPE_BATCH_QUERIES):
+        response = anonymous_client.get(batch_url(requested))
+
+    assert response.status_code == 200
+    assert [recipe['id'] for recipe in response.json()] == ids
+
+
+@pytest.mark.parametrize('size', (5, 50))
+def test_recipe_batch_queries_authenticated(
+        recipes, user_client, django_assert_num_queries, size):
+    ids = [recipe.pk for recipe in recipes[-size:]]
+
+    with django_assert_num_queries(RECIPE_BATCH_USER_QUERIES):
+        response = user_client.get(batch_url(ids))
+
+    assert response.status_code == 200
+    results = response.json()
+    assert [recipe['id'] for recipe in results] == ids
+    assert results[-1]['is_favorited']
+    assert results[-3]['is_in_shopping_cart']
+
+
+@pytest.mark.parametrize('count, status_code', (
+    (BULK_ACTION_LIMIT, 200),
+    (BULK_ACTION_LIMIT + 1, 400),
+))
+def test_recipe_batch_limit(recipes, anonymous_client, count, status_code):
+    ids = [recipe.pk for recipe in recipes] + list(
+        range(999999, 999999 - count + len(recipes), -1))
+
+    response = anonymous_client.get(batch_url(ids))
+
+    assert response.status_code == status_code
+    if status_code == 200:
+        assert len(response.json()) == len(recipes)
+
+
+@pytest.mark.parametrize('ids', ('', ',', '1,x', '0', '-5'))
+def test_recipe_batch_invalid_ids(recipes, anonymous_client, ids):
+    response = anonymous_client.get(f'/api/recipes/?ids={ids}')
+
+    assert response.status_code == 400
+    assert 'ids' in response.json()
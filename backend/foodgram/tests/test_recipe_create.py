@@ -0,0 +1,63 @@
+import pytest
+
+from api.fields import BatchedListSerializer
+from api.serializers import (IngredientInRecipeCreateSerializer,
+                             RecipeCreateSerializer)
+
+pytestmark = pytest.mark.django_db
+
+
+def ingredient_items(ingredients):
+    return [{'id': ingredient.pk, 'amount': number + 1}
+            for number, ingredient in enumerate(ingredients)]
+
+
+def test_ingredients_resolved_with_one_query(ingredients,
+                                             django_assert_num_queries):
+    field = BatchedListSerializer(child=IngredientInRecipeCreateSerializer())
+
+    with django_assert_num_queries(1):
+        items = field.run_validation(ingredient_items(ingredients))
+
+    assert [item['id'] for item in items] == ingredients
+
+
+def test_tags_resolved_with_one_query(tags, django_assert_num_queries):
+    field = RecipeCreateSerializer().fields['tags']
+    pks = [tag.pk for tag in reversed(tags)]
+
+    with django_assert_num_queries(1):
+        resolved = field.run_validation(pks)
+
+    assert [tag.pk for tag in resolved] == pks
+
+
+def test_recipe_relations_resolved_with_two_queries(
+        tags, ingredients, django_assert_num_queries):
+    serializer = RecipeCreateSerializer(data={
+        'tags': [tag.pk for tag in tags],
+        'ingredients': ingredient_items(ingredients),
+    }, partial=True)
+
+    with django_assert_num_queries(2):
+        assert serializer.is_valid(), serializer.errors
+
+
+def test_missing_ids_reported_in_one_error(user_client, tags, ingredients):
+    missing = [ingredient.pk + 1000 for ingredient in ingredients[:3]]
+    response = user_client.post('/api/recipes/', {
+        'tags': [tags[0].pk, 998, 999],
+        'ingredients': ingredient_items(ingredients[3:5]) + [
+            {'id': pk, 'amount': 1} for pk in reversed(missing)],
+        'name': 'Рецепт',
+        'text': 'Описание',
+        'cooking_time': 10,
+    }, format='json')
+
+    assert response.status_code == 400
+    errors = response.json()
+    assert errors['tags'] == [
+        'Недопустимые первичные ключи 998, 999 - объекты не существуют.']
+    assert errors['ingredients'] == {'id': [
+        'Недопустимые первичные ключи {} - объекты не существуют.'.format(
+            ', '.join(map(str, missing)))]}
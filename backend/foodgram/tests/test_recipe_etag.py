@@ -0,0 +1,48 @@
+import pytest
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipe(user, make_recipe):
+    return make_recipe(user)
+
+
+def etag(client, recipe):
+    return client.get(f'/api/recipes/{recipe.pk}/')['ETag']
+
+
+def test_login_keeps_recipe_etag(anonymous_client, another_user, recipe):
+    before = etag(anonymous_client, recipe)
+    response = anonymous_client.post('/api/auth/token/login/', {
+        'email': another_user.email, 'password': 'Pa55-word-for-tests'})
+    assert response.status_code == 200
+    another_user.refresh_from_db()
+    assert another_user.last_login is not None
+
+    assert etag(anonymous_client, recipe) == before
+
+
+def test_author_change_updates_recipe_etag(anonymous_client, user, recipe):
+    before = etag(anonymous_client, recipe)
+    user.first_name = 'Другое имя'
+    user.save()
+
+    assert etag(anonymous_client, recipe) != before
+
+
+@pytest.mark.parametrize('change', ['save', 'delete'])
+def test_ingredient_change_updates_recipe_etag(anonymous_client, recipe,
+                                               change):
+    before = etag(anonymous_client, recipe)
+    item = recipe.recipe_ingredients.first()
+    if change == 'save':
+        item.amount += 1
+        item.save()
+    else:
+        item.delete()
+
+    response = anonymous_client.get(f'/api/recipes/{recipe.pk}/',
+                                    HTTP_IF_NONE_MATCH=before)
+    assert response.status_code == 200
+    assert response['ETag'] != before
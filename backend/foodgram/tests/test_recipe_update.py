@@ -0,0 +1,42 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+pytestmark = pytest.mark.django_db
+
+RECIPE_UPDATE_QUERIES = 14
+
+RELATION_TABLES = ('recipes_ingredientinrecipe', 'recipes_recipe_tags')
+
+
+def current_body(recipe):
+    return {
+        'tags': list(recipe.tags.values_list('pk', flat=True)),
+        'ingredients': [
+            {'id': item.ingredient_id, 'amount': item.amount}
+            for item in recipe.recipe_ingredients.all()
+        ],
+    }
+
+
+def test_text_update_keeps_relations(user_client, user, make_recipe,
+                                     django_assert_num_queries):
+    recipe = make_recipe(user, size=10)
+    body = current_body(recipe)
+    url = f'/api/recipes/{recipe.pk}/'
+    # Прогрев кэша связей пользователя.
+    user_client.get(url)
+
+    for step in range(2):
+        with django_assert_num_queries(RECIPE_UPDATE_QUERIES):
+            with CaptureQueriesContext(connection) as queries:
+                response = user_client.patch(
+                    url, {**body, 'text': f'Описание {step}'}, format='json')
+        assert response.status_code == 200
+        assert response.json()['text'] == f'Описание {step}'
+        writes = [
+            query['sql'] for query in queries.captured_queries
+            if query['sql'].startswith(('INSERT', 'UPDATE', 'DELETE'))
+            and any(table in query['sql'] for table in RELATION_TABLES)
+        ]
+        assert writes == []
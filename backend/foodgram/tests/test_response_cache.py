@@ -0,0 +1,36 @@
+import pytest
+
+from api.cache import recipe_list_cache
+from api.views import RecipeViewSet
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/'
+
+
+def test_anonymous_list_is_cached(anonymous_client, user, make_recipe):
+    make_recipe(user)
+
+    assert anonymous_client.get(URL)['X-Cache'] == 'MISS'
+    assert anonymous_client.get(URL)['X-Cache'] == 'HIT'
+    recipe_list_cache.bump('recipes')
+    assert anonymous_client.get(URL)['X-Cache'] == 'MISS'
+
+
+def test_change_during_query_invalidates_entry(
+        anonymous_client, user, make_recipe, monkeypatch):
+    # Рецепты изменились после запроса к базе, но до записи в кэш.
+    make_recipe(user)
+    get_renderer_context = RecipeViewSet.get_renderer_context
+
+    def bump_then_render(view):
+        recipe_list_cache.bump('recipes')
+        return get_renderer_context(view)
+
+    monkeypatch.setattr(RecipeViewSet, 'get_renderer_context',
+                        bump_then_render)
+    assert anonymous_client.get(URL)['X-Cache'] == 'MISS'
+    monkeypatch.undo()
+
+    assert anonymous_client.get(URL)['X-Cache'] == 'MISS'
+    assert anonymous_client.get(URL)['X-Cache'] == 'HIT'
@@ -0,0 +1,29 @@
+import pytest
+from django.db import connection
+
+pytestmark = pytest.mark.django_db
+
+URL = '/api/recipes/'
+
+
+@pytest.fixture
+def recipes(user, make_recipe):
+    recipes = [make_recipe(user, number) for number in range(3)]
+    recipes[0].name, recipes[0].text = 'Борщ', 'Свекла, Капуста'
+    recipes[1].name, recipes[1].text = 'Салат', 'Капуста, морковь'
+    recipes[2].name, recipes[2].text = 'Капуста тушёная', 'Капуста'
+    for recipe in recipes:
+        recipe.save()
+    return recipes
+
+
+@pytest.mark.parametrize('vendor', ['sqlite', 'mysql'])
+def test_search(monkeypatch, anonymous_client, recipes, vendor):
+    # На других СУБД поиск выполняется через icontains.
+    monkeypatch.setattr(connection, 'vendor', vendor)
+    response = anonymous_client.get(URL, {'search': 'Капуста'})
+
+    assert response.status_code == 200
+    ids = [recipe['id'] for recipe in response.json()['results']]
+    assert ids[0] == recipes[2].pk
+    assert set(ids) == {recipe.pk for recipe in recipes}
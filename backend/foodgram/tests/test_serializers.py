@@ -0,0 +1,74 @@
+import pytest
+from django.test import RequestFactory
+from rest_framework.serializers import ListSerializer
+
+from api.compiled import CompiledListSerializer
+from api.renderers import FastJSONRenderer
+from api.serializers import (IngredientSerializer, RecipeReadSerializer,
+                             TagSerializer)
+from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from users.models import Follow
+
+pytestmark = pytest.mark.django_db
+
+
+def representations(serializer_class, data, context=None):
+    '''Ответы ListSerializer и скомпилированного списка в JSON.'''
+    render = FastJSONRenderer().render
+    standard = ListSerializer(
+        data(), child=serializer_class(), context=dict(context or {}))
+    compiled = serializer_class(
+        data(), many=True, context=dict(context or {}))
+    assert isinstance(compiled, CompiledListSerializer)
+    return render(standard.data), render(compiled.data)
+
+
+@pytest.fixture
+def recipes(user, another_user, make_recipe):
+    recipes = [make_recipe(author, number, size=1 + number % 4)
+               for number, author in enumerate((user, another_user) * 4)]
+    Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes[::2]],
+    ).update(image='recipes/images/full.png')
+    Recipe.objects.filter(
+        pk__in=[recipe.pk for recipe in recipes[::4]],
+    ).update(image_thumbnail='recipes/thumbnails/small.jpg')
+    Favorite.objects.create(user=user, recipe=recipes[1])
+    ShoppingCart.objects.create(user=user, recipe=recipes[2])
+    Follow.objects.create(user=user, author=another_user)
+    return recipes
+
+
+@pytest.mark.parametrize('variant', [None, 'image_thumbnail'])
+@pytest.mark.parametrize('authenticated', [False, True])
+def test_recipes_match(recipes, user, authenticated, variant, settings):
+    settings.ALLOWED_HOSTS = ['testserver']
+    request = RequestFactory().get('/api/recipes/')
+    if authenticated:
+        request.user = user
+    context = {'request': request}
+    if variant:
+        context['image_variant'] = variant
+    standard, compiled = representations(
+        RecipeReadSerializer, Recipe.objects.for_read, context)
+
+    assert compiled == standard
+    assert (b'"image":"http://testserver/media/recipes/thumbnails/'
+            in compiled) is bool(variant)
+    if authenticated:
+        assert b'"is_favorited":true' in compiled
+        assert b'"is_in_shopping_cart":true' in compiled
+        assert b'"is_subscribed":true' in compiled
+
+
+@pytest.mark.parametrize('serializer_class, model, fixture', [
+    (IngredientSerializer, Ingredient, 'ingredients'),
+    (TagSerializer, Tag, 'tags'),
+])
+def test_plain_lists_match(request, serializer_class, model, fixture):
+    request.getfixturevalue(fixture)
+
+    standard, compiled = representations(serializer_class, model.objects.all)
+
+    assert compiled == standard
+    assert compiled != b'[]'
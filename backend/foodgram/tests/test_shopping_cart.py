@@ -0,0 +1,87 @@
+import json
+
+import pytest
+from rest_framework.test import APIClient
+
+from api import pdf
+from recipes.models import ShoppingListItem
+
+URL = '/api/recipes/download_shopping_cart/'
+
+
+@pytest.fixture
+def cart(user, user_client, make_recipe):
+    for number in range(2):
+        response = user_client.post(
+            f'/api/recipes/{make_recipe(user, number).pk}/shopping_cart/')
+        assert response.status_code == 201
+    return dict(ShoppingListItem.objects.filter(user=user).values_list(
+        'ingredient__name', 'total_amount'))
+
+
+def download(client, file_format):
+    response = client.get(URL, {'format': file_format})
+    assert response.status_code == 200
+    if response.streaming:
+        return response, b''.join(response.streaming_content)
+    return response, response.content
+
+
+def test_download_json(cart, user_client):
+    response, body = download(user_client, 'json')
+    assert response['Content-Type'].startswith('application/json')
+    assert {item['name']: item['amount']
+            for item in json.loads(body)} == cart
+
+
+def test_download_csv(cart, user_client):
+    response, body = download(user_client, 'csv')
+    lines = body.decode().splitlines()
+    assert lines[0] == 'name,amount,measurement_unit'
+    assert len(lines) == len(cart) + 1
+
+
+def test_download_txt(cart, user_client):
+    response, body = download(user_client, 'txt')
+    assert response['Content-Disposition'].endswith('.txt')
+    assert body.decode().count('\n') == len(cart)
+
+
+def test_download_pdf(cart, user_client):
+    response, body = download(user_client, 'pdf')
+    assert response['Content-Type'] == 'application/pdf'
+    assert response['Content-Disposition'].endswith('.pdf')
+    assert body.startswith(b'%PDF')
+    assert b'DejaVuSans' in body
+
+
+@pytest.fixture
+def pdf_pool(monkeypatch):
+    # Новый пул: шрифт регистрируется в процессах заново.
+    pool = pdf.WorkerPool(1)
+    monkeypatch.setattr(pdf, 'pool', pool)
+    yield pool
+    pool.shutdown()
+
+
+def test_download_pdf_timeout(cart, user, pdf_pool, monkeypatch):
+    monkeypatch.setattr(pdf, 'PDF_TIMEOUT', 0)
+    client = APIClient()
+    client.force_authenticate(user)
+
+    response = client.get(URL, {'format': 'pdf'})
+
+    assert response.status_code == 503
+    assert response['Content-Type'] == 'application/json'
+    assert 'errors' in response.json()
+
+
+def test_download_pdf_font_error(cart, user, pdf_pool, monkeypatch):
+    monkeypatch.setattr(pdf, 'PDF_FONT_PATH', '/nonexistent/font.ttf')
+    client = APIClient(raise_request_exception=False)
+    client.force_authenticate(user)
+
+    response = client.get(URL, {'format': 'pdf'})
+
+    assert response.status_code == 500
+    assert not response.streaming
@@ -0,0 +1,112 @@
+import pytest
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from recipes.models import (IngredientInRecipe, Recipe, ShoppingCart,
+                            ShoppingListItem)
+
+pytestmark = pytest.mark.django_db
+
+
+@pytest.fixture
+def recipes(user, another_user, user_client, make_recipe):
+    recipes = [make_recipe(another_user, number, size=4)
+               for number in range(3)]
+    for recipe in recipes[:2]:
+        response = user_client.post(
+            f'/api/recipes/{recipe.pk}/shopping_cart/')
+        assert response.status_code == 201
+    ShoppingCart.objects.create(user=another_user, recipe=recipes[0])
+    return recipes
+
+
+def check_shopping_lists():
+    assert ShoppingListItem.objects.exists()
+    call_command('rebuild_shopping_lists', '--check')
+
+
+def delete_recipe(recipes, user, ingredients):
+    recipes[0].delete()
+
+
+def delete_cart(recipes, user, ingredients):
+    ShoppingCart.objects.get(user=user, recipe=recipes[0]).delete()
+
+
+def create_cart(recipes, user, ingredients):
+    ShoppingCart.objects.create(user=user, recipe=recipes[2])
+
+
+def change_cart_recipe(recipes, user, ingredients):
+    cart = ShoppingCart.objects.get(user=user, recipe=recipes[0])
+    cart.recipe = recipes[2]
+    cart.save()
+
+
+def change_amount(recipes, user, ingredients):
+    item = recipes[0].recipe_ingredients.first()
+    item.amount += 5
+    item.save()
+
+
+def change_ingredient(recipes, user, ingredients):
+    item = recipes[0].recipe_ingredients.first()
+    item.ingredient = ingredients[-1]
+    item.save()
+
+
+def create_recipe_ingredient(recipes, user, ingredients):
+    IngredientInRecipe.objects.create(
+        recipe=recipes[1], ingredient=ingredients[-2], amount=7)
+
+
+def delete_recipe_ingredient(recipes, user, ingredients):
+    recipes[1].recipe_ingredients.first().delete()
+
+
+def delete_recipe_ingredients(recipes, user, ingredients):
+    IngredientInRecipe.objects.filter(recipe=recipes[1]).delete()
+
+
+def delete_ingredient(recipes, user, ingredients):
+    recipes[0].recipe_ingredients.first().ingredient.delete()
+
+
+@pytest.mark.parametrize('mutate', [
+    delete_recipe,
+    delete_cart,
+    create_cart,
+    change_cart_recipe,
+    change_amount,
+    change_ingredient,
+    create_recipe_ingredient,
+    delete_recipe_ingredient,
+    delete_recipe_ingredients,
+    delete_ingredient,
+])
+def test_model_changes_keep_shopping_lists(recipes, user, ingredients,
+                                           mutate):
+    check_shopping_lists()
+
+    mutate(recipes, user, ingredients)
+
+    check_shopping_lists()
+
+
+def test_api_changes_keep_shopping_lists(recipes, user, another_user,
+                                         ingredients):
+    check_shopping_lists()
+    client = APIClient()
+    client.force_authenticate(another_user)
+    url = f'/api/recipes/{recipes[0].pk}/'
+    response = client.patch(url, {
+        'tags': list(recipes[0].tags.values_list('pk', flat=True)),
+        'ingredients': [{'id': ingredients[0].pk, 'amount': 3},
+                        {'id': ingredients[-1].pk, 'amount': 4}],
+    }, format='json')
+    assert response.status_code == 200
+    check_shopping_lists()
+
+    assert client.delete(url).status_code == 204
+    check_shopping_lists()
+    assert not Recipe.objects.filter(pk=recipes[0].pk).exists()
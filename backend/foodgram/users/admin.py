@@ -7,7 +7,9 @@ from users.models import Follow, User
 @admin.register(User)
 class UsersAdmin(admin.ModelAdmin):
     list_display = ('username', 'email', 'first_name',
-                    'last_name', 'password',)
+                    'last_name', 'password', 'recipes_count',
+                    'followers_count',)
+    readonly_fields = ('recipes_count', 'followers_count',)
     search_fields = ('username', 'email',)
     list_filter = ('username', 'email',)
     empty_value_display = EMPTY_VALUE_DISPLAY
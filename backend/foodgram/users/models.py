@@ -1,10 +1,14 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from recipes.counters import ProtectedFieldsMixin
 
-class User(AbstractUser):
+
+class User(ProtectedFieldsMixin, AbstractUser):
     """Модель пользователя"""
 
+    protected_fields = ('recipes_count', 'followers_count')
+
     USERNAME_FIELD = 'email'
     REQUIRED_FIELDS = ['username', 'first_name', 'last_name']
 
@@ -29,6 +33,18 @@ class User(AbstractUser):
         'Фамилия',
         max_length=255,
     )
+    recipes_count = models.PositiveIntegerField(
+        'Количество рецептов',
+        default=0,
+    )
+    followers_count = models.PositiveIntegerField(
+        'Количество подписчиков',
+        default=0,
+    )
+    updated_at = models.DateTimeField(
+        'Дата изменения',
+        auto_now=True,
+    )
 
     class Meta:
         ordering = ['-id']